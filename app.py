@@ -1,396 +1,153 @@
-from flask import Flask, render_template, url_for, flash, redirect, request, session
-from extensions import db, bcrypt 
-from models import User, Food, Recipe, Favorite 
-from datetime import datetime, date
-from sqlalchemy import func
+from flask import Flask
+from extensions import db, suggestion_cache, password_hasher, metrics, expiry_scheduler, data_versions, fragment_cache
+from recipe_engine import get_recipe_index
+from recipe_matrix import get_recipe_matrix
+from migrations import upgrade_db
+from expiry import job_status, run_expiry_job
+from db_config import engine_options, init_db_profile, load_profile, normalize_database_url, pool_stats
+from routes import bp
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
 import os
+import time
 
-app = Flask(__name__)
+def create_app(config=None):
+    """Tạo app Flask. config (dict) ghi đè cấu hình đọc từ biến môi trường."""
+    started = time.perf_counter()
+    app = Flask(__name__)
 
-# --- Cấu hình ---
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if DATABASE_URL:
-    app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
-else:
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///database.db"
-
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
-
-db.init_app(app)
-bcrypt.init_app(app)
-
-# -----------------------------------------------------------
-# ROUTES CƠ BẢN
-# -----------------------------------------------------------
-
-@app.route('/')
-def home():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    # Quan trọng: Luôn truyền 'today' để index.html tính toán hạn sử dụng
-    today = date.today()
-    user_foods = Food.query.filter_by(user_id=session['user_id']).order_by(Food.expiration_date.asc()).all()
-    
-    return render_template('index.html', foods=user_foods, today=today)
-
-@app.route("/register", methods=['GET', 'POST'])
-def register():
-    if 'user_id' in session: return redirect(url_for('home'))
-    if request.method == 'POST':
-        username = request.form.get('username')
-        email = request.form.get('email')
-        password = request.form.get('password')
-        
-        existing_user = User.query.filter((User.username == username) | (User.email == email)).first()
-        if existing_user:
-            flash('Tên đăng nhập hoặc Email đã tồn tại!', 'danger')
-            return redirect(url_for('register'))
-
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-        new_user = User(username=username, email=email, password_hash=hashed_password)
-        
-        try:
-            db.session.add(new_user)
-            db.session.commit()
-            flash('Đăng ký thành công!', 'success')
-            return redirect(url_for('login'))
-        except:
-            db.session.rollback()
-            flash('Lỗi hệ thống.', 'danger')
-    return render_template('auth/register.html')
-
-@app.route("/login", methods=['GET', 'POST'])
-def login():
-    if 'user_id' in session: return redirect(url_for('home'))
-    if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password')
-        user = User.query.filter_by(username=username).first()
-
-        if user and bcrypt.check_password_hash(user.password_hash, password):
-            session['user_id'] = user.id
-            session['username'] = user.username
-            flash(f'Chào mừng {user.username} quay trở lại!', 'success')
-            return redirect(url_for('home'))
-        else:
-            flash('Sai tên đăng nhập hoặc mật khẩu.', 'danger')
-    return render_template('auth/login.html')
-
-@app.route("/logout")
-def logout():
-    session.clear()
-    flash('Đã đăng xuất.', 'info')
-    return redirect(url_for('login'))
-
-# -----------------------------------------------------------
-# QUẢN LÝ THỰC PHẨM (Hỗ trợ Modal)
-# -----------------------------------------------------------
-
-@app.route("/add_food", methods=['POST'])
-def add_food():
-    if 'user_id' not in session: return redirect(url_for('login'))
-
-    try:
-        name = request.form.get('name')
-        quantity = float(request.form.get('quantity'))
-        unit = request.form.get('unit')
-        location = request.form.get('location')
-        date_str = request.form.get('expiration_date')
-        expiration_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        
-        new_food = Food(
-            name=name, quantity=quantity, unit=unit,
-            location=location, expiration_date=expiration_date,
-            user_id=session['user_id']
-        )
-        db.session.add(new_food)
-        db.session.commit()
-        flash(f'Đã thêm {name}!', 'success')
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Lỗi: {str(e)}', 'danger')
-        
-    return redirect(url_for('home')) # Luôn quay về trang chủ vì dùng Modal
-
-@app.route('/edit_food/<int:id>', methods=['POST'])
-def edit_food(id):
-    if 'user_id' not in session: return redirect(url_for('login'))
-    food = Food.query.get_or_404(id)
-    if food.user_id != session['user_id']: return redirect(url_for('home'))
-
-    try:
-        food.name = request.form.get('name')
-        food.quantity = float(request.form.get('quantity'))
-        food.unit = request.form.get('unit')
-        food.location = request.form.get('location')
-        date_str = request.form.get('expiration_date')
-        food.expiration_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        
-        db.session.commit()
-        flash('Cập nhật thành công!', 'success')
-    except:
-        db.session.rollback()
-        flash('Lỗi khi cập nhật.', 'danger')
-
-    return redirect(url_for('home')) # Quay về trang chủ sau khi sửa xong Modal
-
-@app.route('/delete_food/<int:id>')
-def delete_food(id):
-    if 'user_id' not in session: return redirect(url_for('login'))
-    food = Food.query.get_or_404(id)
-    if food.user_id == session['user_id']:
-        db.session.delete(food)
-        db.session.commit()
-        flash('Đã xóa thực phẩm.', 'info')
-    return redirect(url_for('home'))
-
-# -----------------------------------------------------------
-# GỢI Ý & THỐNG KÊ
-# -----------------------------------------------------------
-
-# Route Suggest
-@app.route('/suggest')
-def suggest():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-
-    uid = session['user_id']
-    today = date.today()
-    all_foods = Food.query.filter_by(user_id=uid).all()
-    
-    # 1. Danh sách thực phẩm sắp hết hạn (còn <= 3 ngày) để tính trọng số
-    soon_to_expire_names = [f.name.lower().strip() for f in all_foods 
-                           if 0 <= (f.expiration_date - today).days <= 3]
-    
-    fridge_items = [f.name.lower().strip() for f in all_foods]
-    fav_ids = [f.recipe_id for f in Favorite.query.filter_by(user_id=uid).all()]
-    all_recipes_list = Recipe.query.all()
-    
-    smart_suggestions = []
-    for recipe in all_recipes_list:
-        recipe_ingredients = [i.strip().lower() for i in recipe.ingredients_list.split(',')]
-        
-        matches = []
-        urgency_bonus = 0
-        
-        for need in recipe_ingredients:
-            # Kiểm tra xem có nguyên liệu này trong tủ không
-            found_in_fridge = any(item in need or need in item for item in fridge_items)
-            
-            if found_in_fridge:
-                matches.append(need)
-                # 🌟 TRỌNG SỐ MỚI: Nếu nguyên liệu này sắp hết hạn, cộng thêm 30 điểm thưởng
-                is_urgent = any(soon in need or need in soon for soon in soon_to_expire_names)
-                if is_urgent:
-                    urgency_bonus += 10 
-
-        # Tính điểm cơ bản (Phần trăm hoàn thành)
-        base_score = int((len(matches) / len(recipe_ingredients)) * 100) if recipe_ingredients else 0
-        
-        # Tổng điểm = Điểm cơ bản + Điểm thưởng khẩn cấp
-        total_score = base_score + urgency_bonus
-        is_fav = recipe.id in fav_ids
-
-        # ✅ Lọc: Chỉ hiện món yêu thích HOẶC món có điểm tổng hợp cao (> 50)
-        if is_fav or total_score > 50:
-            smart_suggestions.append({
-                'info': recipe,
-                'score': total_score, # Đây giờ là điểm ưu tiên tổng hợp
-                'base_score': base_score,
-                'is_urgent': urgency_bonus > 0,
-                'matches': matches,
-                'missing': set(recipe_ingredients) - set(matches),
-                'is_fav': is_fav
-            })
-
-    # Sắp xếp: Ưu tiên món Yêu thích -> Sau đó đến món có tổng điểm (độ tươi + độ gấp) cao nhất
-    smart_suggestions.sort(key=lambda x: (x['is_fav'], x['score']), reverse=True)
-
-    all_recipes_sorted = sorted(all_recipes_list, key=lambda x: x.id in fav_ids, reverse=True)
-
-    return render_template('food/suggest.html', 
-                           all_recipes=all_recipes_sorted, 
-                           smart_suggestions=smart_suggestions,
-                           fav_ids=fav_ids)
-
-@app.route('/toggle_favorite/<int:recipe_id>', methods=['POST'])
-def toggle_favorite(recipe_id):
-    if 'user_id' not in session:
-        return {"error": "Unauthorized"}, 401
-    
-    uid = session['user_id']
-    # Tìm xem bản ghi đã tồn tại chưa
-    fav = Favorite.query.filter_by(user_id=uid, recipe_id=recipe_id).first()
-
-    if fav:
-        db.session.delete(fav)
-        status = "unhearted"
-    else:
-        new_fav = Favorite(user_id=uid, recipe_id=recipe_id)
-        db.session.add(new_fav)
-        status = "hearted"
-    
-    db.session.commit()
-    return {"status": status}
-
-@app.route('/statistics')
-def statistics():
-    if 'user_id' not in session: return redirect(url_for('login'))
-    uid = session['user_id']
-    today = date.today()
-    all_foods = Food.query.filter_by(user_id=uid).all()
-
-    # 1. Thống kê vị trí và Phân loại hạn dùng
-    location_data = db.session.query(Food.location, func.count(Food.id)).filter_by(user_id=uid).group_by(Food.location).all()
-    expired_list, soon_list, fresh_list = [], [], []
-    for f in all_foods:
-        days = (f.expiration_date - today).days
-        if days < 0: expired_list.append(f)
-        elif days <= 3: soon_list.append(f)
-        else: fresh_list.append(f)
-
-    # 2. Phân tích Dinh dưỡng
-    groups = {
-        'Đạm': ['thịt', 'cá', 'tôm', 'trứng', 'giò', 'chả', 'sườn', 'bò', 'gà'],
-        'Chất xơ': ['rau', 'cải', 'muống', 'ngót', 'bí', 'bầu', 'mướp', 'súp lơ'],
-        'Vitamin': ['quả', 'trái', 'cam', 'táo', 'chuối', 'bơ', 'nho', 'xoài'],
-        'Sữa/Bơ': ['sữa', 'phô mai', 'yogurt', 'váng sữa'],
-        'Tinh bột': ['bánh', 'mỳ', 'miến', 'bún', 'ngô', 'khoai']
-    }
-    nutrition_counts = {key: 0 for key in groups}
-    for f in all_foods:
-        name_lower = f.name.lower()
-        for group, keywords in groups.items():
-            if any(k in name_lower for k in keywords):
-                nutrition_counts[group] += 1
-                break
-
-    # 3. Tính điểm Sức khỏe và Lời khuyên
-    health_score = 100
-    if len(all_foods) > 0:
-        score = 100 - (len(expired_list) * 10) - (len(soon_list) * 5)
-        health_score = max(0, score)
-
-    # Tạo danh sách lời khuyên dựa trên dữ liệu
-    advice = []
-    if health_score >= 80:
-        advice.append("🌟 Bạn quản lý tủ lạnh rất tuyệt vời, hãy tiếp tục phát huy!")
-    elif health_score >= 50:
-        advice.append("⚠️ Tủ lạnh bắt đầu có dấu hiệu quá tải đồ cũ, bạn nên kiểm tra lại.")
+    # --- Cấu hình ---
+    DATABASE_URL = normalize_database_url(os.environ.get("DATABASE_URL"))
+    if DATABASE_URL:
+        app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
     else:
-        advice.append("🚨 Báo động! Tủ lạnh đang rất mất cân đối và nhiều đồ hỏng.")
-
-    if expired_list:
-        advice.append(f"❌ Có {len(expired_list)} món đã quá hạn. Bạn nên bỏ ngay để bảo vệ sức khỏe.")
-    if soon_list:
-        advice.append(f"⏰ Nhắc nhở: Hãy nấu món '{soon_list[0].name}' ngay vì nó sắp hết hạn.")
-    
-    # Kiểm tra nhóm chất thiếu
-    missing = [group for group, count in nutrition_counts.items() if count == 0]
-    if missing:
-        advice.append(f"🛒 Lần tới đi chợ, hãy bổ sung thêm: {', '.join(missing)}.")
-
-    return render_template('statistics.html', 
-                           location_labels=[row[0] for row in location_data],
-                           location_values=[row[1] for row in location_data],
-                           status_values=[len(expired_list), len(soon_list), len(fresh_list)],
-                           nutrition_labels=list(nutrition_counts.keys()),
-                           nutrition_values=list(nutrition_counts.values()),
-                           health_score=health_score,
-                           expired_list=expired_list, soon_list=soon_list, fresh_list=fresh_list,
-                           today=today,
-                           advice=advice)
-
-@app.route('/init_recipes')
-def init_recipes():
-    # Xóa dữ liệu cũ để nạp lại bản chuẩn hóa
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///database.db"
+
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["DB_SELF_CHECK"] = os.environ.get("DB_SELF_CHECK", "1") == "1"
+    # Tạo/nâng cấp bảng ngay khi khởi động (với gunicorn --preload chỉ master chạy một lần)
+    app.config["DB_AUTO_UPGRADE"] = os.environ.get("DB_AUTO_UPGRADE", "0") == "1"
+    # Làm nóng trước khi nhận request: mapper, template, chỉ mục công thức
+    app.config["WARM_UP"] = os.environ.get("WARM_UP", "1") == "1"
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
+    app.config["SUGGEST_TOP_K"] = int(os.environ.get("SUGGEST_TOP_K", 50)) # Số món gợi ý tối đa
+    # Cache gợi ý: "memory" (1 worker), "sqlite" (dùng chung giữa các worker gunicorn) hoặc "none" (tắt).
+    # gunicorn.conf.py chọn "sqlite" khi chạy nhiều worker mà biến này chưa được đặt.
+    app.config["SUGGEST_CACHE_BACKEND"] = os.environ.get("SUGGEST_CACHE_BACKEND", "memory")
+    app.config["SUGGEST_CACHE_SIZE"] = int(os.environ.get("SUGGEST_CACHE_SIZE", 1000))
+    app.config["SUGGEST_CACHE_PATH"] = os.environ.get("SUGGEST_CACHE_PATH")
+    # Trả 304 cho trang chủ, gợi ý và thống kê khi dữ liệu của user không đổi
+    app.config["CONDITIONAL_GET"] = os.environ.get("CONDITIONAL_GET", "1") == "1"
+    app.config["FRAGMENT_CACHE_SIZE"] = int(os.environ.get("FRAGMENT_CACHE_SIZE", 10000)) # Số thẻ công thức đã render được giữ lại
+    app.config["FRIDGE_PAGE_SIZE"] = int(os.environ.get("FRIDGE_PAGE_SIZE", 50)) # Số thực phẩm mỗi trang
+    app.config["IMPORT_BATCH_SIZE"] = int(os.environ.get("IMPORT_BATCH_SIZE", 1000)) # Số dòng mỗi transaction khi nhập file
+    app.config["BATCH_MAX_OPS"] = int(os.environ.get("BATCH_MAX_OPS", 500)) # Số thao tác tối đa mỗi request /foods/batch
+    app.config["CATALOG_BATCH_SIZE"] = int(os.environ.get("CATALOG_BATCH_SIZE", 500)) # Số công thức mỗi transaction khi nạp danh mục
+    # Băm mật khẩu: cost bcrypt, số process băm và số yêu cầu được phép chờ.
+    # Không đặt biến môi trường thì PasswordHasher tự chọn theo số CPU
+    app.config["BCRYPT_LOG_ROUNDS"] = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+    for key in ("PASSWORD_HASH_WORKERS", "PASSWORD_HASH_MAX_PENDING"):
+        if os.environ.get(key):
+            app.config[key] = int(os.environ[key])
+    app.config["PASSWORD_HASH_POOL"] = os.environ.get("PASSWORD_HASH_POOL", "process")
+    # Xuất số liệu tại /metrics (chỉ bật cho mạng nội bộ, endpoint không có xác thực)
+    app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "0") == "1"
+    # Cảnh báo trong log khi một request chạy quá số câu SQL này (0 = tắt)
+    app.config["QUERY_BUDGET"] = int(os.environ.get("QUERY_BUDGET", 0))
+    # Job làm mới bảng thực phẩm sắp hết hạn: chạy trong process web (EXPIRY_SCHEDULER=1)
+    # hoặc qua cron bằng lệnh "flask refresh-expiring"
+    app.config["EXPIRY_SCHEDULER"] = os.environ.get("EXPIRY_SCHEDULER", "0") == "1"
+    app.config["EXPIRY_RUN_HOUR"] = int(os.environ.get("EXPIRY_RUN_HOUR", 2)) # Giờ chạy mỗi ngày
+    app.config["EXPIRY_BATCH_SIZE"] = int(os.environ.get("EXPIRY_BATCH_SIZE", 500)) # Số user mỗi transaction
+
+    if config:
+        app.config.update(config)
+
+    # Các giá trị phụ thuộc vào database đã chọn (sau khi ghi đè)
+    uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    # Pool/PRAGMA theo loại database (xem db_config.py), có thể ghi đè bằng biến môi trường
+    app.config.setdefault("DB_PROFILE", load_profile(uri))
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(uri, app.config["DB_PROFILE"]))
+    # "sql": chấm điểm ngay trong database (phù hợp Postgres), "index": chỉ mục trong bộ nhớ,
+    # "matrix": ma trận NumPy trong bộ nhớ
+    app.config.setdefault("SUGGEST_BACKEND", os.environ.get(
+        "SUGGEST_BACKEND", "sql" if uri.startswith("postgres") else "index"))
+
+    db.init_app(app)
+    init_db_profile(app, db)
+    suggestion_cache.init_app(app)
+    data_versions.init_app(app, db)
+    fragment_cache.init_app(app)
+    password_hasher.init_app(app)
+    metrics.init_app(app, db)
+    metrics.add_gauge_source('suggest_cache', suggestion_cache.stats)
+    metrics.add_gauge_source('fragment_cache', fragment_cache.stats)
+    metrics.add_gauge_source('password_hasher', password_hasher.stats)
+    metrics.add_gauge_source('db_pool', lambda: pool_stats(db.engine))
+    expiry_scheduler.init_app(app, db, lambda today: run_expiry_job(today, batch_size=app.config["EXPIRY_BATCH_SIZE"]),
+                              enabled=app.config["EXPIRY_SCHEDULER"], run_hour=app.config["EXPIRY_RUN_HOUR"])
+    metrics.add_gauge_source('expiry_scheduler', expiry_scheduler.stats)
+    metrics.add_gauge_source('expiry_job', job_status)
+
+    app.register_blueprint(bp)
+
+    if app.config["WARM_UP"]:
+        warm_up(app)
+    metrics.record_startup('create_app', time.perf_counter() - started)
+    app.logger.info('Khởi tạo app mất %.3f s', metrics.startup['create_app'])
+    return app
+
+def warm_up(app):
+    # Làm trước những việc mà request đầu tiên của mỗi worker phải trả giá. Với
+    # gunicorn --preload, kết quả nằm sẵn trong bộ nhớ của master và được các
+    # worker dùng chung sau khi fork.
+    def timed(phase, fn):
+        start = time.perf_counter()
+        fn()
+        metrics.record_startup(f'warm_up_{phase}', time.perf_counter() - start)
+
+    # 1. Cấu hình quan hệ giữa các model (SQLAlchemy làm lười ở truy vấn đầu tiên)
+    timed('mappers', configure_mappers)
+
+    # 2. Biên dịch mọi template vào cache của Jinja
+    def compile_templates():
+        for name in app.jinja_env.list_templates(extensions=['html']):
+            app.jinja_env.get_template(name)
+    timed('templates', compile_templates)
+
+    # 3. Tạo bảng (nếu bật) và dựng chỉ mục / ma trận công thức
     with app.app_context():
-        db.session.query(Recipe).delete()
-        
-        recipes = [
-            Recipe(name="Trứng chiên hành lá", ingredients_list="Trứng gà, Hành lá, Nước mắm", 
-                   instructions="1. Đập trứng vào bát.\n2. Thêm hành lá băm nhỏ và một chút nước mắm.\n3. Đánh tan trứng rồi chiên trên chảo nóng cho đến khi vàng đều."),
-            
-            Recipe(name="Đậu phụ sốt cà chua", ingredients_list="Đậu phụ, Cà chua, Hành lá", 
-                   instructions="1. Thái đậu phụ thành khối vuông, rán vàng.\n2. Cà chua băm nhỏ, xào cho nhuyễn thành sốt.\n3. Cho đậu đã rán vào rim cùng sốt cà chua trong 5 phút."),
-            
-            Recipe(name="Thịt lợn rang cháy cạnh", ingredients_list="Thịt lợn, Hành tím, Nước mắm", 
-                   instructions="1. Thái thịt mỏng.\n2. Rang thịt trên chảo cho đến khi ra bớt mỡ và cạnh hơi cháy vàng.\n3. Thêm hành tím băm và nước mắm, đảo đều cho thấm."),
-            
-            Recipe(name="Rau muống xào tỏi", ingredients_list="Rau muống, Tỏi, Dầu ăn", 
-                   instructions="1. Rau muống luộc sơ qua nước sôi.\n2. Phi thơm tỏi băm với dầu ăn.\n3. Cho rau vào xào lửa lớn, nêm gia vị vừa ăn rồi tắt bếp."),
-            
-            Recipe(name="Canh cà chua trứng", ingredients_list="Cà chua, Trứng gà, Hành lá", 
-                   instructions="1. Xào nhuyễn cà chua với dầu ăn.\n2. Thêm nước sôi vào nồi.\n3. Đổ trứng đã đánh tan vào, khuấy nhẹ để tạo vân rồi thêm hành lá."),
-            
-            Recipe(name="Sườn xào chua ngọt", ingredients_list="Sườn heo, Cà chua, Hành tây", 
-                   instructions="1. Sườn luộc sơ rồi rán vàng cạnh.\n2. Pha hỗn hợp sốt cà chua, đường, giấm.\n3. Cho sườn và hành tây vào rim cùng sốt cho đến khi sền sệt."),
-            
-            Recipe(name="Thịt kho tàu", ingredients_list="Thịt lợn, Trứng gà, Nước dừa", 
-                   instructions="1. Thịt lợn thái miếng to, ướp gia vị.\n2. Cho thịt và trứng đã luộc vào nồi nước dừa.\n3. Kho nhỏ lửa cho đến khi thịt mềm và nước có màu cánh gián."),
-            
-            Recipe(name="Canh rau cải thịt băm", ingredients_list="Rau cải, Thịt lợn, Gừng", 
-                   instructions="1. Xào sơ thịt băm với hành tím.\n2. Thêm nước và vài lát gừng vào đun sôi.\n3. Cho rau cải vào nấu chín tới rồi nêm gia vị."),
-            
-            Recipe(name="Gà kho gừng", ingredients_list="Thịt gà, Gừng, Hành tím", 
-                   instructions="1. Gà chặt miếng vừa ăn, ướp gia vị.\n2. Gừng thái sợi, hành tím băm nhỏ.\n3. Kho gà với gừng và một ít nước màu cho đến khi thịt săn và thấm vị."),
-            
-            Recipe(name="Bò xào cần tây", ingredients_list="Thịt bò, Cần tây, Hành tây", 
-                   instructions="1. Thịt bò thái mỏng, ướp tỏi.\n2. Xào thịt bò chín tái rồi để riêng.\n3. Xào cần tây và hành tây chín tới, sau đó cho bò vào đảo nhanh tay."),
-            
-            Recipe(name="Cá kho tộ", ingredients_list="Cá, Thịt lợn, Hành tím", 
-                   instructions="1. Cá cắt khúc, thịt ba chỉ thái nhỏ.\n2. Xếp cá và thịt vào tộ, thêm nước mắm và nước hàng.\n3. Kho cho đến khi nước cạn gần hết và cá chắc thịt."),
-            
-            Recipe(name="Canh bí đỏ thịt băm", ingredients_list="Bí đỏ, Thịt lợn, Hành lá", 
-                   instructions="1. Bí đỏ gọt vỏ, thái miếng vừa ăn.\n2. Nấu thịt băm với nước cho sôi.\n3. Cho bí đỏ vào hầm cho đến khi bí chín mềm."),
-            
-            Recipe(name="Salad cà chua dưa chuột", ingredients_list="Cà chua, Dưa chuột, Xà lách", 
-                   instructions="1. Cà chua và dưa chuột thái lát mỏng.\n2. Trộn đều với xà lách.\n3. Thêm sốt dầu giấm và trộn nhẹ tay trước khi ăn."),
-            
-            Recipe(name="Salad ức gà áp chảo", ingredients_list="Ức gà, Xà lách, Cà chua", 
-                   instructions="1. Ức gà ướp muối tiêu rồi áp chảo chín đều, thái lát.\n2. Sắp xếp xà lách và cà chua ra đĩa.\n3. Đặt thịt gà lên trên và thêm sốt mè rang."),
-            
-            Recipe(name="Salad bơ trứng gà", ingredients_list="Bơ, Trứng gà, Xà lách", 
-                   instructions="1. Bơ thái miếng, trứng gà luộc chín thái múi cau.\n2. Trộn xà lách với sốt mayonnaise hoặc sữa chua.\n3. Trang trí bơ và trứng lên trên mặt salad.")
-        ]
-        
-        db.session.add_all(recipes)
-        db.session.commit()
-    return "Hệ thống đã chuẩn hóa 15 công thức món ăn thành công!"
-
-@app.route('/account', methods=['GET', 'POST'])
-def account():
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
-    
-    user = User.query.get(session['user_id'])
-
-    if request.method == 'POST':
-        old_pass = request.form.get('old_password')
-        new_pass = request.form.get('new_password')
-        
-        if old_pass and new_pass:
-            # Kiểm tra mật khẩu cũ có khớp với hash trong DB không
-            if bcrypt.check_password_hash(user.password_hash, old_pass):
-                user.password_hash = bcrypt.generate_password_hash(new_pass).decode('utf-8')
-                db.session.commit()
-                flash('Cập nhật mật khẩu thành công!', 'success')
-            else:
-                flash('Mật khẩu cũ không chính xác.', 'danger')
-        return redirect(url_for('account'))
-
-    # Lấy danh sách các món ăn mà user này đã nhấn yêu thích
-    # Chúng ta sử dụng join để lấy được thông tin chi tiết từ bảng Recipe
-    user_favorites = Favorite.query.filter_by(user_id=user.id).all()
-
-    return render_template('auth/account.html', user=user, favorites=user_favorites)
-@app.route("/init_db")
-def init_db():
-    with app.app_context():
-        db.create_all()
-    return "Database initialized!"
+        try:
+            if app.config["DB_AUTO_UPGRADE"]:
+                timed('upgrade_db', upgrade_db)
+            def build_indexes():
+                index = get_recipe_index()
+                if app.config["SUGGEST_BACKEND"] == "matrix":
+                    get_recipe_matrix(index)
+            timed('recipe_index', build_indexes)
+
+            # 4. Render sẵn thẻ công thức của tab "Tất cả" (trạng thái chưa thích),
+            #    chỉ những thẻ mà cache giữ được
+            def render_cards():
+                macro = app.jinja_env.get_template('food/_recipe_card.html').module.recipe_card
+                recipes = get_recipe_index().recipes[:fragment_cache.backend.max_size]
+                fragment_cache.render_cards('recipe-card', recipes, macro)
+            timed('recipe_cards', render_cards)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            app.logger.warning('Bỏ qua dựng chỉ mục công thức khi khởi động (đã chạy "flask upgrade-db" chưa?): %s', getattr(e, 'orig', e))
+        finally:
+            db.session.remove()
+            # Không mang kết nối đã mở sang các worker sau khi fork
+            db.engine.dispose()
+
+def __getattr__(name):
+    # Giữ "gunicorn app:app" của các bản triển khai cũ chạy được: app.app chính là
+    # wsgi.app, chỉ được dựng khi có người truy cập (import create_app() thì không)
+    if name == 'app':
+        from wsgi import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
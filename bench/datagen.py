@@ -0,0 +1,99 @@
+# File: bench/datagen.py
+# Sinh dữ liệu giả lập có seed cố định cho benchmark: N user, M thực phẩm mỗi user
+# (phân bố hạn dùng gần với thực tế), K công thức và một số món yêu thích.
+# Ghi thẳng bằng INSERT hàng loạt để dựng được dữ liệu lớn trong vài giây.
+import os
+import random
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.engine import make_url
+
+from extensions import db
+from models import Favorite, Food, Recipe, RecipeIngredient, User, normalize_ingredient, split_ingredients
+from nutrition import classify_food
+
+INGREDIENTS = [
+    'Trứng gà', 'Hành lá', 'Nước mắm', 'Đậu phụ', 'Cà chua', 'Thịt lợn', 'Hành tím', 'Rau muống',
+    'Tỏi', 'Dầu ăn', 'Sườn heo', 'Hành tây', 'Nước dừa', 'Rau cải', 'Gừng', 'Thịt gà', 'Thịt bò',
+    'Cần tây', 'Cá', 'Bí đỏ', 'Dưa chuột', 'Xà lách', 'Ức gà', 'Bơ', 'Tôm', 'Mực', 'Nấm hương',
+    'Cà rốt', 'Khoai tây', 'Bắp cải', 'Súp lơ', 'Sữa tươi', 'Phô mai', 'Bánh mỳ', 'Bún', 'Miến',
+    'Ngô', 'Chuối', 'Táo', 'Cam', 'Xoài', 'Rau ngót', 'Mướp', 'Bầu', 'Giò lụa', 'Chả cá', 'Sữa chua',
+]
+UNITS = ['Quả', 'Hộp', 'Kg', 'Gram', 'Gói']
+LOCATIONS = ['Ngăn mát', 'Ngăn đá', 'Kệ rau củ', 'Cánh cửa', 'Tủ đồ khô']
+
+
+def expiry_offset(rng):
+    # ~10% đã quá hạn, ~20% sắp hết hạn (0-3 ngày), còn lại còn tươi (tối đa 2 tháng)
+    roll = rng.random()
+    if roll < 0.10:
+        return rng.randint(-14, -1)
+    if roll < 0.30:
+        return rng.randint(0, 3)
+    return int(rng.expovariate(1 / 12)) + 4 if rng.random() < 0.8 else rng.randint(4, 60)
+
+
+def is_disposable(url):
+    # Chỉ coi là CSDL dùng riêng cho benchmark: SQLite trong bộ nhớ hoặc nằm trong
+    # thư mục tạm, hoặc CSDL có tên chứa "bench" (vd. postgresql:///fridge_bench)
+    url = make_url(str(url))
+    database = url.database or ''
+    if url.get_backend_name() == 'sqlite':
+        if database in ('', ':memory:'):
+            return True
+        tmp = os.path.realpath(tempfile.gettempdir())
+        return os.path.realpath(database).startswith(tmp + os.sep)
+    return 'bench' in database.lower()
+
+
+def _insert(model, rows, batch_size=5000):
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(db.insert(model), rows[i:i + batch_size])
+
+
+def generate(users=10, foods_per_user=50, recipes=1000, favorites_per_user=5, seed=42, today=None,
+             destroy=False):
+    """Xóa và dựng lại toàn bộ schema rồi sinh dữ liệu. Trả về danh sách user_id.
+    Từ chối chạy trên CSDL không phải dùng riêng cho benchmark, trừ khi destroy=True."""
+    if not destroy and not is_disposable(db.engine.url):
+        raise RuntimeError(f'Từ chối xóa CSDL {db.engine.url!r}: chỉ chạy trên CSDL tạm hoặc có tên '
+                           f'chứa "bench" (dùng --destroy nếu thật sự muốn xóa)')
+    rng = random.Random(seed)
+    today = today or date.today()
+    now = datetime.utcnow()
+    db.drop_all()
+    db.create_all()
+
+    recipe_rows, ingredient_rows = [], []
+    for rid in range(1, recipes + 1):
+        ingredients_list = ', '.join(rng.sample(INGREDIENTS, rng.randint(2, 6)))
+        recipe_rows.append({
+            'id': rid, 'name': f'Món thử nghiệm {rid}', 'ingredients_list': ingredients_list,
+            'instructions': '1. Sơ chế nguyên liệu.\n2. Nấu chín.\n3. Nêm nếm vừa ăn.',
+            'external_id': f'bench-{rid}', 'updated_at': now,
+        })
+        ingredient_rows += [{'recipe_id': rid, 'position': i, 'normalized_name': name}
+                            for i, name in enumerate(split_ingredients(ingredients_list))]
+    _insert(Recipe, recipe_rows)
+    _insert(RecipeIngredient, ingredient_rows)
+
+    user_rows, food_rows, fav_rows = [], [], []
+    for uid in range(1, users + 1):
+        user_rows.append({'id': uid, 'username': f'user{uid}', 'email': f'user{uid}@bench.local',
+                          'password_hash': 'bench', 'created_at': now})
+        for _ in range(foods_per_user):
+            name = rng.choice(INGREDIENTS)
+            food_rows.append({
+                'name': name, 'quantity': rng.randint(1, 5), 'unit': rng.choice(UNITS),
+                'location': rng.choice(LOCATIONS),
+                'expiration_date': today + timedelta(days=expiry_offset(rng)),
+                'nutrition_group': classify_food(name), 'normalized_name': normalize_ingredient(name), 'added_at': now, 'user_id': uid,
+            })
+        for rid in rng.sample(range(1, recipes + 1), min(favorites_per_user, recipes)):
+            fav_rows.append({'user_id': uid, 'recipe_id': rid})
+    _insert(User, user_rows)
+    _insert(Food, food_rows)
+    _insert(Favorite, fav_rows)
+    db.session.commit()
+    return [row['id'] for row in user_rows]
@@ -0,0 +1,254 @@
+# File: bench/run.py
+# Benchmark có thể lặp lại cho các trang nặng (/, /suggest, /statistics, /account)
+# và các hàm chấm điểm gợi ý, ở nhiều quy mô dữ liệu.
+#
+# Ví dụ:
+#   python bench/run.py --scales 10x50x1000,50x200x10000 --output bench.json
+#   python bench/run.py --database-url postgresql://localhost/fridge_bench
+#   python bench/run.py --compare bench.json      # so sánh với lần chạy trước
+#
+# Mỗi quy mô có dạng USERSxFOODSxRECIPES. Kết quả là JSON gồm p50/p95/p99 (ms),
+# số câu SQL trung bình mỗi lần gọi và bộ nhớ đỉnh (tracemalloc) của từng kịch bản.
+# Ở mỗi quy mô, gợi ý của vài user còn được so với thuật toán gốc (mục "parity");
+# có khác biệt thì lệnh thoát với mã 1.
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ['/', '/suggest', '/statistics', '/account']
+
+
+def percentile(values, pct):
+    # Phương pháp nearest-rank
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def measure(fn, calls, counter):
+    # Đo độ trễ từng lần gọi, sau đó chạy lại một lượt ngắn dưới tracemalloc để lấy bộ nhớ đỉnh
+    latencies, queries = [], 0
+    for args in calls:
+        before = counter.count
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries += counter.count - before
+
+    tracemalloc.start()
+    for args in calls[:min(len(calls), 5)]:
+        fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'n': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'queries_per_call': round(queries / len(latencies), 2) if latencies else 0.0,
+        'peak_mem_kib': round(peak / 1024, 1),
+    }
+
+
+def run_scale(app, scale, args, counter):
+    from extensions import db, suggestion_cache
+    from models import Favorite, Food, normalize_ingredient
+    from recipe_engine import get_recipe_index, invalidate_recipe_index, suggest_sql
+    from recipe_matrix import get_recipe_matrix, load_fridges
+    from bench.datagen import generate
+
+    users, foods, recipes = scale
+    results = []
+    with app.app_context():
+        t0 = time.perf_counter()
+        user_ids = generate(users=users, foods_per_user=foods, recipes=recipes,
+                            favorites_per_user=args.favorites, seed=args.seed, destroy=args.destroy)
+        gen_seconds = time.perf_counter() - t0
+        invalidate_recipe_index()
+        suggestion_cache.clear()
+
+    sample = [user_ids[i % len(user_ids)] for i in range(args.requests)]
+    scale_info = {'users': users, 'foods_per_user': foods, 'recipes': recipes,
+                  'generate_seconds': round(gen_seconds, 3)}
+
+    # 1. Qua Flask test client (cache gợi ý tắt để đo đường tính toán thật)
+    client = app.test_client()
+
+    def get(uid, path):
+        with client.session_transaction() as sess:
+            sess['user_id'], sess['username'] = uid, f'user{uid}'
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+    for path in PAGES:
+        get(sample[0], path)  # Làm nóng (dựng chỉ mục, biên dịch template)
+        stats = measure(get, [(uid, path) for uid in sample], counter)
+        results.append(dict(scenario=f'GET {path}', scale=scale_info, **stats))
+
+    # 2. Gọi trực tiếp các hàm chấm điểm
+    today = date.today()
+    with app.app_context():
+        index = get_recipe_index()
+
+        def score_index(uid):
+            foods_ = Food.query.filter_by(user_id=uid).all()
+            fav_ids = [f.recipe_id for f in Favorite.query.filter_by(user_id=uid)]
+            names = [normalize_ingredient(f.name) for f in foods_]
+            soon = [normalize_ingredient(f.name) for f in foods_ if 0 <= (f.expiration_date - today).days <= 3]
+            index.suggest(names, soon, fav_ids, top_k=app.config['SUGGEST_TOP_K'])
+
+        def score_sql(uid):
+            fav_ids = [f.recipe_id for f in Favorite.query.filter_by(user_id=uid)]
+            suggest_sql(uid, today, fav_ids, top_k=app.config['SUGGEST_TOP_K'])
+            db.session.rollback()
+
+        matrix = get_recipe_matrix(index)
+
+        def score_matrix(uid):
+            fridge_names, soon, fav_ids = load_fridges([uid], today)[uid]
+            matrix.suggest(fridge_names, soon, fav_ids, top_k=app.config['SUGGEST_TOP_K'])
+
+        for name, fn in [('score index.suggest', score_index), ('score suggest_sql', score_sql),
+                         ('score matrix.suggest', score_matrix)]:
+            stats = measure(fn, [(uid,) for uid in sample], counter)
+            results.append(dict(scenario=name, scale=scale_info, **stats))
+
+        # Chấm điểm cho toàn bộ user trong một lượt (như job tính trước hằng đêm)
+        def score_all():
+            matrix.suggest_many(load_fridges(user_ids, today), top_k=app.config['SUGGEST_TOP_K'])
+
+        stats = measure(score_all, [()] * 3, counter)
+        results.append(dict(scenario='score matrix.suggest_many (all users)', scale=scale_info, **stats))
+    return results
+
+
+def check_parity(app, scale, args):
+    # So gợi ý của mọi cách chấm điểm với thuật toán gốc trên vài user đầu tiên
+    from models import User
+    from suggest_parity import check_suggestions
+
+    with app.app_context():
+        user_ids = [uid for (uid,) in User.query.with_entities(User.id).order_by(User.id).limit(args.parity_users)]
+        mismatched = check_suggestions(user_ids, date.today(), top_k=app.config['SUGGEST_TOP_K'])
+    for backend, uids in mismatched.items():
+        if uids:
+            print(f'  Gợi ý của {backend} khác thuật toán gốc ở {len(uids)}/{len(user_ids)} user: {uids[:10]}',
+                  file=sys.stderr)
+    return {'scale': {'users': scale[0], 'foods_per_user': scale[1], 'recipes': scale[2]},
+            'users_checked': len(user_ids), 'mismatched': mismatched}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    # In chênh lệch p50/p95 so với một file kết quả trước đó
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    key = lambda r: (r['scenario'], r['scale']['users'], r['scale']['foods_per_user'], r['scale']['recipes'])
+    old = {key(r): r for r in baseline['results']}
+    for r in current['results']:
+        prev = old.get(key(r))
+        if not prev:
+            continue
+        deltas = ', '.join(f"{m} {prev[m]:.2f} -> {r[m]:.2f} ({(r[m] - prev[m]) / prev[m] * 100 if prev[m] else 0:+.0f}%)"
+                           for m in ('p50_ms', 'p95_ms', 'queries_per_call'))
+        print(f'{r["scenario"]:<22} {key(r)[1:]}: {deltas}', file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Smart Fridge')
+    parser.add_argument('--scales', default='10x50x1000,50x200x10000',
+                        help='Danh sách USERSxFOODSxRECIPES, phân tách bằng dấu phẩy')
+    parser.add_argument('--requests', type=int, default=50, help='Số lần gọi mỗi kịch bản')
+    parser.add_argument('--favorites', type=int, default=5, help='Số món yêu thích mỗi user')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='Mặc định: file SQLite tạm')
+    parser.add_argument('--output', help='Ghi JSON kết quả vào file (mặc định: stdout)')
+    parser.add_argument('--compare', help='File JSON của lần chạy trước để so sánh')
+    parser.add_argument('--parity-users', type=int, default=5,
+                        help='Số user được so với thuật toán gốc ở mỗi quy mô (0 = bỏ qua)')
+    parser.add_argument('--destroy', action='store_true',
+                        help='Cho phép xóa toàn bộ dữ liệu của --database-url không phải CSDL benchmark')
+    args = parser.parse_args(argv)
+
+    from bench.datagen import is_disposable
+    if args.database_url and not args.destroy and not is_disposable(args.database_url):
+        parser.error(f'{args.database_url} sẽ bị xóa sạch; chỉ dùng CSDL tạm hoặc có tên chứa "bench", '
+                     f'hoặc thêm --destroy')
+
+    scales = [tuple(int(x) for x in s.lower().split('x')) for s in args.scales.split(',')]
+    tmpdir = tempfile.mkdtemp(prefix='fridge-bench-')
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{tmpdir}/bench.db'
+    os.environ.setdefault('SUGGEST_CACHE_BACKEND', 'none')
+    os.environ.setdefault('DB_SELF_CHECK', '0')
+    os.environ.setdefault('WARM_UP', '0')  # Bảng chưa được tạo lúc tạo app
+
+    from app import create_app
+    app = create_app()
+    from db_config import backend_name
+    from extensions import db
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'database': backend_name(os.environ['DATABASE_URL']),
+            'seed': args.seed,
+            'requests': args.requests,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': [],
+        'parity': [],
+    }
+    for scale in scales:
+        print(f'Quy mô {scale[0]} user x {scale[1]} thực phẩm x {scale[2]} công thức...', file=sys.stderr)
+        report['results'] += run_scale(app, scale, args, counter)
+        if args.parity_users:
+            report['parity'].append(check_parity(app, scale, args))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        compare(report, args.compare)
+    if any(uids for entry in report['parity'] for uids in entry['mismatched'].values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# File: catalog.py
+# Nạp danh mục công thức từ file JSON/NDJSON/CSV theo kiểu upsert.
+# Mỗi công thức có external_id ổn định: món đã có thì cập nhật tại chỗ (không xóa
+# nên Favorite không bị mất), món không đổi nội dung thì bỏ qua nhờ content_hash.
+# File được đọc theo luồng và ghi theo lô, mỗi lô một transaction ngắn.
+import csv
+import hashlib
+import io
+import itertools
+import json
+from datetime import datetime
+
+from extensions import db
+from models import Recipe, RecipeIngredient, split_ingredients
+
+DEFAULT_CATALOG = 'data/recipes.json'
+READ_CHUNK = 64 * 1024
+
+
+def content_hash(name, ingredients_list, instructions, image_url):
+    payload = json.dumps([name, ingredients_list, instructions, image_url], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _iter_json_array(text, buffer):
+    # Đọc lần lượt từng phần tử của một mảng JSON lớn mà không parse cả file
+    decoder = json.JSONDecoder()
+    pos = buffer.index('[') + 1
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError('File JSON không hợp lệ hoặc bị cắt cụt')
+            chunk = text.read(READ_CHUNK)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        buffer, pos = buffer[end:], 0
+
+
+def iter_catalog(stream, fmt='json'):
+    # Hỗ trợ: mảng JSON, NDJSON (mỗi dòng một object) và CSV có dòng tiêu đề
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        yield from csv.DictReader(text)
+        return
+
+    buffer = text.read(READ_CHUNK)
+    if buffer.lstrip().startswith('['):
+        yield from _iter_json_array(text, buffer)
+        return
+    # NDJSON: ghép phần đã đọc thử (kèm nốt dòng đang dở) với phần còn lại của file
+    for line in itertools.chain(io.StringIO(buffer + text.readline()), text):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None  # Được tính là một dòng lỗi
+
+
+def normalize_record(record):
+    external_id = str(record.get('external_id') or record.get('id') or '').strip()
+    name = (record.get('name') or '').strip()
+    ingredients = record.get('ingredients_list') or record.get('ingredients') or ''
+    if isinstance(ingredients, list):
+        ingredients = ', '.join(ingredients)
+    instructions = record.get('instructions') or ''
+    if not external_id or not name or not ingredients.strip():
+        raise ValueError('Thiếu external_id, name hoặc ingredients_list')
+
+    values = {
+        'name': name[:100],
+        'ingredients_list': ingredients,
+        'instructions': instructions,
+        'image_url': record.get('image_url') or None,
+    }
+    values['content_hash'] = content_hash(values['name'], values['ingredients_list'],
+                                          values['instructions'], values['image_url'])
+    return external_id[:64], values
+
+
+def _upsert_batch(batch, result):
+    existing = {r.external_id: r for r in
+                Recipe.query.filter(Recipe.external_id.in_(list(batch))).all()}
+
+    # Công thức cũ (trước khi có external_id) được nhận lại theo tên để giữ Favorite
+    missing_names = [values['name'] for ext, values in batch.items() if ext not in existing]
+    legacy = {}
+    if missing_names:
+        for r in Recipe.query.filter(Recipe.external_id.is_(None), Recipe.name.in_(missing_names)):
+            legacy.setdefault(r.name, r)
+
+    # Mỗi loại thay đổi một câu lệnh hàng loạt, nguyên liệu được xóa và chèn lại theo lô
+    # (gán từng recipe.ingredients_list sẽ tải rồi ghi danh sách nguyên liệu của từng món một)
+    inserts, updates, new_ingredients = [], [], {}
+    now = datetime.utcnow()
+    for external_id, values in batch.items():
+        recipe = existing.get(external_id) or legacy.pop(values['name'], None)
+        if recipe is None:
+            inserts.append(dict(values, external_id=external_id, updated_at=now))
+            result['inserted'] += 1
+        elif recipe.content_hash == values['content_hash'] and recipe.external_id == external_id:
+            result['unchanged'] += 1
+        else:
+            updates.append(dict(values, id=recipe.id, external_id=external_id, updated_at=now))
+            if recipe.ingredients_list != values['ingredients_list']:
+                new_ingredients[recipe.id] = values['ingredients_list']
+            result['updated'] += 1
+    if inserts:
+        ids = db.session.scalars(db.insert(Recipe).returning(Recipe.id, sort_by_parameter_order=True), inserts)
+        new_ingredients.update((rid, row['ingredients_list']) for rid, row in zip(ids, inserts))
+    if updates:
+        db.session.execute(db.update(Recipe), updates)
+    if new_ingredients:
+        db.session.execute(db.delete(RecipeIngredient).where(RecipeIngredient.recipe_id.in_(list(new_ingredients))))
+        db.session.execute(db.insert(RecipeIngredient), [
+            {'recipe_id': rid, 'position': i, 'normalized_name': name}
+            for rid, ingredients_list in new_ingredients.items()
+            for i, name in enumerate(split_ingredients(ingredients_list))
+        ])
+    db.session.commit()
+
+
+def load_catalog(records, batch_size=500):
+    result = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+    batch = {}
+    for record in records:
+        try:
+            external_id, values = normalize_record(record)
+        except (AttributeError, TypeError, ValueError):
+            result['failed'] += 1
+            continue
+        batch[external_id] = values  # Trùng external_id trong cùng lô: bản sau thắng
+        if len(batch) >= batch_size:
+            _upsert_batch(batch, result)
+            batch = {}
+    if batch:
+        _upsert_batch(batch, result)
+    return result
+
+
+def load_catalog_file(path, fmt=None, batch_size=500):
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'json')
+    with open(path, 'rb') as f:
+        return load_catalog(iter_catalog(f, fmt), batch_size=batch_size)
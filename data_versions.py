@@ -0,0 +1,116 @@
+# File: data_versions.py
+# Phiên bản dữ liệu theo user để trả lời GET có điều kiện (ETag / Last-Modified).
+# Mỗi thay đổi Food/Favorite đổi phiên bản của user (cột User.data_version), còn
+# danh mục công thức được nhận diện bằng catalog_signature(). ETag của trang ghép
+# (user, ngày hôm nay, epoch của bản triển khai, và danh mục với trang phụ thuộc vào
+# danh mục), nên một lượt tải lại khi không có gì thay đổi được trả 304 mà không
+# cần render template.
+# Cả hai đều đọc từ database nên mọi worker gunicorn và lệnh CLI (nạp danh mục,
+# nhập dữ liệu) thấy cùng một phiên bản.
+import hashlib
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from functools import wraps
+
+from flask import make_response, request, session
+
+
+class DataVersions:
+    def __init__(self):
+        self.db = None
+        self.enabled = True
+        self.epoch = ''
+
+    def init_app(self, app, db):
+        self.db = db
+        self.enabled = app.config.setdefault('CONDITIONAL_GET', True)
+        # Epoch đổi theo mỗi bản triển khai (mặc định: thời điểm sửa template mới nhất)
+        # để trình duyệt không giữ HTML của phiên bản cũ
+        self.epoch = app.config.setdefault('ETAG_EPOCH', self._template_epoch(app))
+
+    @staticmethod
+    def _template_epoch(app):
+        latest = 0
+        for root, _, files in os.walk(os.path.join(app.root_path, app.template_folder or 'templates')):
+            for name in files:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+        return str(latest)
+
+    @staticmethod
+    def _new_version(previous):
+        # (mã ngẫu nhiên, thời điểm đổi). Last-Modified chỉ chính xác tới giây:
+        # luôn tiến ít nhất 1 giây mỗi lần đổi
+        changed = datetime.utcnow()
+        if previous is not None and changed < previous + timedelta(seconds=1):
+            changed = previous + timedelta(seconds=1)
+        return uuid.uuid4().hex[:12], changed
+
+    def bump_user(self, uid):
+        # Ghi trong transaction của thay đổi dữ liệu, trước commit của nó: thay đổi và
+        # phiên bản mới cùng được lưu hoặc cùng bị hoàn tác
+        from models import User
+        previous = self.db.session.query(User.data_changed_at).filter_by(id=uid).scalar()
+        token, changed = self._new_version(previous)
+        self.db.session.execute(self.db.update(User).where(User.id == uid)
+                                .values(data_version=token, data_changed_at=changed))
+
+    def bump_all(self):
+        # Dữ liệu của mọi user bị sửa hàng loạt (ví dụ lệnh backfill-nutrition)
+        from models import User
+        token, changed = self._new_version(None)
+        self.db.session.execute(self.db.update(User).values(data_version=token, data_changed_at=changed))
+
+    def validators(self, uid, day, catalog=False):
+        # (etag, last_modified) cho trang của user trong ngày, None nếu không dùng được.
+        # catalog=True: trang có hiển thị danh mục công thức (thêm một truy vấn tổng hợp)
+        from models import User
+        from recipe_engine import catalog_signature
+        if not self.enabled:
+            return None, None
+        row = self.db.session.query(User.data_version, User.data_changed_at).filter_by(id=uid).first()
+        if row is None:
+            return None, None
+        # User chưa từng đổi dữ liệu: mã rỗng, lần đổi đầu tiên sẽ tạo mã mới
+        user_token, user_changed = row.data_version or '', row.data_changed_at
+        count, max_id, catalog_changed = catalog_signature() if catalog else ('', '', None)
+        raw = f'{self.epoch}:{uid}:{day.isoformat()}:{count}:{max_id}:{catalog_changed}:{user_token}'
+        etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+        # Các cột DateTime lưu giờ UTC không kèm múi giờ
+        changed = [datetime.combine(day, datetime.min.time()).timestamp()]
+        changed += [t.replace(tzinfo=timezone.utc).timestamp() for t in (user_changed, catalog_changed) if t]
+        last_modified = datetime.fromtimestamp(int(max(changed)), timezone.utc)
+        return etag, last_modified
+
+    def conditional(self, view=None, *, catalog=False):
+        """Decorator cho trang GET của user đã đăng nhập: trả 304 nếu dữ liệu không đổi.
+        Dùng @conditional(catalog=True) cho trang phụ thuộc cả danh mục công thức."""
+        if view is None:
+            return lambda view: self.conditional(view, catalog=catalog)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            uid = session.get('user_id')
+            # Còn thông báo flash chờ hiển thị thì phải render lại trang
+            if uid is None or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            etag, last_modified = self.validators(uid, date.today(), catalog=catalog)
+            if etag is None:
+                return view(*args, **kwargs)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since:
+                not_modified = last_modified <= request.if_modified_since
+            else:
+                not_modified = False
+
+            response = make_response('', 304) if not_modified else make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                response.last_modified = last_modified
+                # Trình duyệt luôn hỏi lại server; proxy dùng chung không được lưu
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+        return wrapper
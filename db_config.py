@@ -0,0 +1,161 @@
+# File: db_config.py
+# Cấu hình kết nối database theo từng loại backend.
+# - Postgres: kích thước pool, overflow, pre-ping, recycle và statement_timeout.
+#   statement_timeout chỉ áp dụng cho transaction trong request web (SET LOCAL), để
+#   lệnh CLI như upgrade-db, load-recipes hay refresh-expiring không bị hủy giữa chừng.
+# - SQLite: WAL, mức synchronous, busy_timeout và cache_size, áp dụng mỗi khi mở
+#   kết nối để nhiều worker gunicorn cùng ghi không bị "database is locked".
+import os
+
+from flask import current_app, has_request_context
+from sqlalchemy import event, text
+
+PROFILES = {
+    'postgresql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'statement_timeout_ms': 5000,
+    },
+    'sqlite': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout_ms': 5000,
+        'cache_size_kib': 20000,
+    },
+}
+
+# Biến môi trường ghi đè từng thiết lập của profile
+ENV_OVERRIDES = {
+    'pool_size': ('DB_POOL_SIZE', int),
+    'max_overflow': ('DB_MAX_OVERFLOW', int),
+    'pool_timeout': ('DB_POOL_TIMEOUT', int),
+    'pool_recycle': ('DB_POOL_RECYCLE', int),
+    'pool_pre_ping': ('DB_POOL_PRE_PING', lambda v: v == '1'),
+    'statement_timeout_ms': ('DB_STATEMENT_TIMEOUT_MS', int),
+    'journal_mode': ('SQLITE_JOURNAL_MODE', str),
+    'synchronous': ('SQLITE_SYNCHRONOUS', str),
+    'busy_timeout_ms': ('SQLITE_BUSY_TIMEOUT_MS', int),
+    'cache_size_kib': ('SQLITE_CACHE_SIZE_KIB', int),
+}
+
+
+def normalize_database_url(url):
+    # Một số nhà cung cấp (Render, Heroku) vẫn trả về "postgres://" mà SQLAlchemy 2 không nhận
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def backend_name(url):
+    return 'postgresql' if url.startswith('postgresql') else 'sqlite' if url.startswith('sqlite') else 'other'
+
+
+def load_profile(url, environ=os.environ):
+    profile = dict(PROFILES.get(backend_name(url), {}))
+    for key in profile:
+        env_name, cast = ENV_OVERRIDES[key]
+        if environ.get(env_name):
+            profile[key] = cast(environ[env_name])
+    return profile
+
+
+def engine_options(url, profile):
+    # Giá trị cho SQLALCHEMY_ENGINE_OPTIONS
+    backend = backend_name(url)
+    if backend == 'postgresql':
+        return {
+            'pool_size': profile['pool_size'],
+            'max_overflow': profile['max_overflow'],
+            'pool_timeout': profile['pool_timeout'],
+            'pool_recycle': profile['pool_recycle'],
+            'pool_pre_ping': profile['pool_pre_ping'],
+        }
+    if backend == 'sqlite':
+        return {'connect_args': {'timeout': profile['busy_timeout_ms'] / 1000}}
+    return {}
+
+
+def install_sqlite_pragmas(engine, profile):
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f"PRAGMA journal_mode={profile['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={profile['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(profile['busy_timeout_ms'])}")
+        # Giá trị âm nghĩa là tính theo KiB thay vì số trang
+        cursor.execute(f"PRAGMA cache_size=-{int(profile['cache_size_kib'])}")
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def _set_local_timeout(connection, timeout_ms):
+    connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout_ms)}')
+
+
+def _request_statement_timeout(session, transaction, connection):
+    # Mỗi transaction mở trong lúc xử lý request (một request có thể commit nhiều lần)
+    if not has_request_context() or connection.dialect.name != 'postgresql':
+        return
+    timeout_ms = current_app.config['DB_PROFILE'].get('statement_timeout_ms')
+    if timeout_ms:
+        _set_local_timeout(connection, timeout_ms)
+
+
+def install_statement_timeout(db):
+    # Gắn vào lớp Session của Flask-SQLAlchemy, nên chỉ đăng ký một lần
+    if not event.contains(db.session, 'after_begin', _request_statement_timeout):
+        event.listen(db.session, 'after_begin', _request_statement_timeout)
+
+
+def effective_settings(engine):
+    # Đọc lại thiết lập thực tế từ database để kiểm tra khi khởi động
+    backend = engine.dialect.name
+    with engine.connect() as conn:
+        if backend == 'sqlite':
+            return {name: conn.execute(text(f'PRAGMA {name}')).scalar()
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'foreign_keys')}
+        if backend == 'postgresql':
+            return {'statement_timeout': conn.execute(text('SHOW statement_timeout')).scalar(),
+                    'server_version': conn.execute(text('SHOW server_version')).scalar()}
+    return {}
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            stats[name] = fn()
+    if 'size' in stats and 'checkedout' in stats:
+        capacity = stats['size'] + max(getattr(pool, '_max_overflow', 0), 0)
+        stats['utilization'] = stats['checkedout'] / capacity if capacity else 0.0
+    return stats
+
+
+def init_db_profile(app, db):
+    # Gọi sau db.init_app(app): gắn PRAGMA cho SQLite và chạy tự kiểm tra khi khởi động
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    profile = app.config['DB_PROFILE']
+    with app.app_context():
+        engine = db.engine
+        if backend_name(url) == 'sqlite':
+            install_sqlite_pragmas(engine, profile)
+        if backend_name(url) == 'postgresql':
+            install_statement_timeout(db)
+        if app.config.get('DB_SELF_CHECK', True):
+            try:
+                settings = effective_settings(engine)
+            except Exception as e:
+                app.logger.warning('Không kiểm tra được kết nối database lúc khởi động: %s', e)
+                return
+            app.logger.info('Database %s: profile=%s, effective=%s, pool=%s',
+                            engine.dialect.name, profile, settings, pool_stats(engine))
+            wanted = profile.get('journal_mode', '').lower()
+            if wanted and str(settings.get('journal_mode', '')).lower() != wanted:
+                # Ví dụ: database trong bộ nhớ không hỗ trợ WAL
+                app.logger.warning('SQLite đang dùng journal_mode=%s thay vì %s',
+                                   settings.get('journal_mode'), wanted)
@@ -0,0 +1,162 @@
+# File: expiry.py
+# Bảng "sắp hết hạn" được tính sẵn (ExpiringItem).
+# Job hằng ngày duyệt user theo từng lô id, với mỗi lô xóa rồi chép lại các thực
+# phẩm đã quá hạn / còn <= 3 ngày bằng một câu INSERT ... SELECT. Tiến độ được lưu
+# trong JobState sau mỗi lô nên job chạy tiếp được sau khi bị ngắt. User nào chưa
+# được làm mới trong ngày (job chưa chạy tới) sẽ được làm mới ngay khi mở trang.
+# Cùng lượt đó, nhóm hạn dùng trong bộ đếm thống kê (food_stats.py) được tính lại.
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
+
+import food_stats
+from extensions import db
+from food_queries import SOON_DAYS
+from models import ExpiringItem, Food, JobState, User
+
+JOB_NAME = 'expiry'
+LEASE = timedelta(minutes=10)  # Owner không báo sống quá lâu thì process khác được nhận job
+
+
+def refresh_users(user_ids, today):
+    # Làm mới bảng ExpiringItem của các user trong cùng transaction của người gọi.
+    # UPDATE user trước để khóa các dòng user, tránh hai tiến trình cùng chép một user.
+    db.session.execute(db.update(User).where(User.id.in_(user_ids)).values(expiry_as_of=today))
+    db.session.execute(db.delete(ExpiringItem).where(ExpiringItem.user_id.in_(user_ids)))
+    status = case((Food.expiration_date < today, 'expired'), else_='soon')
+    rows = (db.select(Food.user_id, Food.id, Food.name, Food.location, Food.expiration_date, status)
+            .where(Food.user_id.in_(user_ids), Food.expiration_date <= today + timedelta(days=SOON_DAYS)))
+    db.session.execute(db.insert(ExpiringItem).from_select(
+        ['user_id', 'food_id', 'name', 'location', 'expiration_date', 'status'], rows))
+
+
+def apply_food_changes(uid, changes, today):
+    """Cập nhật ExpiringItem và bộ đếm thống kê cho các thực phẩm vừa thêm, sửa
+    hoặc xóa. changes: [(before, after)] dạng food_stats.FoodState, before=None khi
+    thêm mới, after=None khi xóa. Gọi sau khi flush thay đổi Food, trong
+    transaction của người gọi."""
+    if db.session.query(User.expiry_as_of).filter_by(id=uid).scalar() != today:
+        refresh_users([uid], today)  # Bảng của ngày cũ: chép lại cả tủ, đã gồm các thay đổi này
+    else:
+        removed = [before.id for before, _ in changes if before is not None]
+        if removed:
+            db.session.execute(db.delete(ExpiringItem).where(ExpiringItem.food_id.in_(removed)))
+        rows = [{'user_id': uid, 'food_id': after.id, 'name': after.name, 'location': after.location,
+                 'expiration_date': after.expiration_date,
+                 'status': 'expired' if after.expiration_date < today else 'soon'}
+                for _, after in changes
+                if after is not None and after.expiration_date <= today + timedelta(days=SOON_DAYS)]
+        if rows:
+            db.session.execute(db.insert(ExpiringItem), rows)
+    food_stats.apply_changes(uid, changes, today)
+
+
+def ensure_fresh(uid, today):
+    # Có thể commit: gọi trước khi tải các đối tượng ORM dùng cho trang
+    if db.session.query(User.expiry_as_of).filter_by(id=uid).scalar() != today:
+        refresh_users([uid], today)
+        db.session.commit()
+
+
+def expiring_items(uid, today):
+    # (danh sách đã quá hạn, danh sách sắp hết hạn) theo thứ tự thêm vào tủ
+    ensure_fresh(uid, today)
+    expired, soon = [], []
+    for item in ExpiringItem.query.filter_by(user_id=uid).order_by(ExpiringItem.food_id):
+        (expired if item.status == 'expired' else soon).append(item)
+    return expired, soon
+
+
+def expiring_by_status(uid, today, status, limit=None):
+    # Chỉ một nhóm ('expired' hoặc 'soon'), dùng chỉ mục (user_id, status, food_id)
+    ensure_fresh(uid, today)
+    return (ExpiringItem.query.filter_by(user_id=uid, status=status)
+            .order_by(ExpiringItem.food_id).limit(limit).all())
+
+
+def expiring_counts(uid, today):
+    ensure_fresh(uid, today)
+    counts = dict(db.session.query(ExpiringItem.status, func.count(ExpiringItem.id))
+                  .filter_by(user_id=uid).group_by(ExpiringItem.status).all())
+    return counts.get('expired', 0), counts.get('soon', 0)
+
+
+# -----------------------------------------------------------
+# JOB HẰNG NGÀY
+# -----------------------------------------------------------
+
+def _claim(owner):
+    # Nhận job bằng một câu UPDATE có điều kiện: chỉ một process chạy tại một thời điểm
+    if db.session.get(JobState, JOB_NAME) is None:
+        try:
+            db.session.add(JobState(name=JOB_NAME, last_user_id=0, processed=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Process khác vừa tạo
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        db.update(JobState)
+        .where(JobState.name == JOB_NAME,
+               or_(JobState.owner.is_(None), JobState.owner == owner, JobState.heartbeat < now - LEASE))
+        .values(owner=owner, heartbeat=now)
+    ).rowcount == 1
+    db.session.commit()
+    return claimed
+
+
+def run_expiry_job(today, batch_size=500, owner=None):
+    """Làm mới ExpiringItem (và nhóm hạn dùng của bộ đếm thống kê) cho mọi user.
+    Trả về số user đã xử lý trong lượt này, hoặc None nếu job đang được process
+    khác chạy."""
+    owner = owner or f'{socket.gethostname()}:{os.getpid()}'
+    if not _claim(owner):
+        return None
+
+    processed = 0
+    try:
+        state = db.session.get(JobState, JOB_NAME)
+        if state.run_date != today:
+            # Ngày mới: bắt đầu lại từ đầu. Cùng ngày thì chạy tiếp từ last_user_id.
+            state.run_date, state.last_user_id, state.processed, state.finished_at = today, 0, 0, None
+            db.session.commit()
+        if state.finished_at is not None:
+            return 0  # Hôm nay đã chạy xong
+
+        while True:
+            user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.id > state.last_user_id)
+                        .order_by(User.id).limit(batch_size)]
+            if not user_ids:
+                break
+            refresh_users(user_ids, today)
+            food_stats.refresh(user_ids, today)
+            # Lưu tiến độ trong cùng transaction với dữ liệu của lô
+            state.last_user_id = user_ids[-1]
+            state.processed += len(user_ids)
+            state.heartbeat = datetime.utcnow()
+            db.session.commit()
+            processed += len(user_ids)
+
+        state.finished_at = datetime.utcnow()
+        db.session.commit()
+        return processed
+    finally:
+        db.session.rollback()
+        db.session.execute(db.update(JobState).where(JobState.name == JOB_NAME, JobState.owner == owner)
+                           .values(owner=None))
+        db.session.commit()
+
+
+def job_status():
+    state = db.session.get(JobState, JOB_NAME)
+    if state is None:
+        return {'run_date': None}
+    return {
+        'run_date': state.run_date.isoformat() if state.run_date else None,
+        'last_user_id': state.last_user_id,
+        'processed': state.processed,
+        'running': state.owner is not None,
+        'finished_at': state.finished_at.isoformat() if state.finished_at else None,
+    }
@@ -1,7 +1,22 @@
 # File: extensions.py
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
+from suggest_cache import SuggestionCache
+from passwords import PasswordHasher
+from instrumentation import Metrics
+from scheduler import DailyScheduler
+from data_versions import DataVersions
+from fragment_cache import FragmentCache
 
 # Khởi tạo các đối tượng nhưng chưa gắn vào app ngay
 db = SQLAlchemy()
-bcrypt = Bcrypt()
\ No newline at end of file
+suggestion_cache = SuggestionCache()
+# Băm mật khẩu trong pool riêng (tương thích hash của Flask-Bcrypt)
+password_hasher = PasswordHasher()
+# Số liệu hiệu năng theo request, xuất tại /metrics
+metrics = Metrics()
+# Job hằng ngày làm mới bảng thực phẩm sắp hết hạn
+expiry_scheduler = DailyScheduler('expiry')
+# Phiên bản dữ liệu theo user cho ETag/304 của các trang chính
+data_versions = DataVersions()
+# HTML đã render của từng thẻ công thức, dùng lại giữa các user
+fragment_cache = FragmentCache()
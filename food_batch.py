@@ -0,0 +1,150 @@
+# File: food_batch.py
+# Nhiều thao tác trên thực phẩm trong một request JSON (POST /foods/batch):
+# create / update / delete / adjust (cộng trừ số lượng). Quyền sở hữu được kiểm tra
+# bằng một truy vấn, các thao tác hợp lệ chạy trong một transaction với mỗi loại
+# một câu lệnh hàng loạt, và kết quả được trả về cho từng thao tác để giao diện
+# cập nhật tại chỗ thay vì mỗi món một lượt chuyển trang.
+import math
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import SQLAlchemyError
+
+from expiry import apply_food_changes
+from extensions import data_versions, db, suggestion_cache
+from food_io import FIELDS, food_to_json, parse_fields, parse_food
+from food_stats import FoodState, food_state
+from models import Food
+
+OPERATIONS = ('create', 'update', 'delete', 'adjust')
+
+
+def parse_operation(op, uid):
+    # (loại, id thực phẩm, giá trị đã kiểm tra); ValueError nếu không hợp lệ
+    if not isinstance(op, dict):
+        raise ValueError('Mỗi thao tác phải là một đối tượng JSON')
+    kind = op.get('op')
+    if kind not in OPERATIONS:
+        raise ValueError(f'Thao tác phải là một trong: {", ".join(OPERATIONS)}')
+    if kind == 'create':
+        return kind, None, parse_food(op, uid)
+
+    food_id = op.get('id')
+    if not isinstance(food_id, int) or isinstance(food_id, bool):
+        raise ValueError('Thiếu id thực phẩm')
+    if kind == 'update':
+        fields = [field for field in FIELDS if field in op]
+        if not fields:
+            raise ValueError('Không có trường nào để cập nhật')
+        return kind, food_id, parse_fields(op, fields)
+    if kind == 'adjust':
+        try:
+            delta = float(op.get('delta'))
+        except (TypeError, ValueError):
+            raise ValueError('Lượng điều chỉnh (delta) không hợp lệ')
+        if not math.isfinite(delta) or delta == 0:
+            raise ValueError('Lượng điều chỉnh (delta) không hợp lệ')
+        return kind, food_id, delta
+    return kind, food_id, None
+
+
+def apply_batch(uid, operations, today):
+    """Áp dụng danh sách thao tác của user trong một transaction. Thao tác lỗi chỉ
+    được báo lỗi, không chặn các thao tác còn lại."""
+    results = [None] * len(operations)
+
+    def done(i, kind, food_id, error=None):
+        results[i] = {'index': i, 'op': kind, 'id': food_id, 'status': 'error' if error else 'ok'}
+        if error:
+            results[i]['error'] = error
+
+    # 1. Kiểm tra dữ liệu từng thao tác (mỗi thực phẩm chỉ được sửa một lần trong lô)
+    parsed, ids = [], set()
+    for i, op in enumerate(operations):
+        try:
+            kind, food_id, value = parse_operation(op, uid)
+        except ValueError as e:
+            raw = op if isinstance(op, dict) else {}
+            done(i, raw.get('op'), raw.get('id'), str(e))
+            continue
+        if food_id in ids:
+            done(i, kind, food_id, 'Mỗi thực phẩm chỉ được xuất hiện một lần trong lô')
+            continue
+        if food_id is not None:
+            ids.add(food_id)
+        parsed.append((i, kind, food_id, value))
+
+    # 2. Quyền sở hữu: một truy vấn cho mọi id được nhắc tới
+    owned = {}
+    if ids:
+        for row in db.session.query(Food.id, Food.name, Food.location, Food.nutrition_group,
+                                    Food.expiration_date, Food.quantity).filter(Food.user_id == uid, Food.id.in_(ids)):
+            owned[row.id] = row
+
+    creates, updates, adjusts, deletes, pending = [], [], [], [], []
+    for i, kind, food_id, value in parsed:
+        if kind != 'create' and food_id not in owned:
+            done(i, kind, food_id, 'Không tìm thấy thực phẩm')
+            continue
+        if kind == 'create':
+            creates.append(value)
+        elif kind == 'update':
+            updates.append(dict(value, id=food_id))
+        elif kind == 'adjust':
+            quantity = owned[food_id].quantity + value
+            if not math.isfinite(quantity) or quantity <= 0:
+                done(i, kind, food_id, 'Số lượng sau khi điều chỉnh phải lớn hơn 0 (dùng hết thì xóa món)')
+                continue
+            adjusts.append({'food_id': food_id, 'delta': value})
+        else:
+            deletes.append(food_id)
+        pending.append((i, kind, food_id))
+
+    # 3. Một transaction, mỗi loại thao tác một câu lệnh
+    if pending:
+        try:
+            if deletes:
+                db.session.execute(db.delete(Food).where(Food.user_id == uid, Food.id.in_(deletes)))
+            if updates:
+                db.session.execute(db.update(Food), updates)  # UPDATE hàng loạt theo khóa chính
+            if adjusts:
+                table = Food.__table__
+                db.session.execute(table.update().where(table.c.id == bindparam('food_id'))
+                                   .values(quantity=table.c.quantity + bindparam('delta')), adjusts)
+            created_ids = []
+            if creates:
+                created_ids = list(db.session.scalars(
+                    db.insert(Food).returning(Food.id, sort_by_parameter_order=True), creates))
+
+            # Đọc lại các dòng đã đổi (một truy vấn) để trả về và cập nhật bảng tính sẵn
+            changed_ids = created_ids + [row['id'] for row in updates] + [row['food_id'] for row in adjusts]
+            after = {}
+            if changed_ids:
+                after = {food.id: food for food in Food.query.filter(Food.id.in_(changed_ids))
+                         .execution_options(populate_existing=True)}
+            before = {food_id: FoodState(*owned[food_id][:5]) for food_id in deletes + [row['id'] for row in updates]}
+            # Đổi số lượng không ảnh hưởng tới bảng sắp hết hạn hay bộ đếm thống kê
+            changes = ([(None, food_state(after[food_id])) for food_id in created_ids]
+                       + [(before[row['id']], food_state(after[row['id']])) for row in updates]
+                       + [(before[food_id], None) for food_id in deletes])
+            if changes:
+                apply_food_changes(uid, changes, today)
+            # Lấy JSON trước khi commit (commit làm hết hạn các đối tượng đã tải)
+            foods_json = {food_id: food_to_json(food, today) for food_id, food in after.items()}
+            suggestion_cache.invalidate(uid)
+            data_versions.bump_user(uid)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for i, kind, food_id in pending:
+                done(i, kind, food_id, f'Lỗi database: {e.__class__.__name__}')
+        else:
+            new_ids = iter(created_ids)
+            for i, kind, food_id in pending:
+                if kind == 'create':
+                    food_id = next(new_ids)
+                done(i, kind, food_id)
+                if kind != 'delete':
+                    results[i]['food'] = foods_json[food_id]
+
+    applied = sum(1 for result in results if result['status'] == 'ok')
+    return {'results': results, 'applied': applied, 'failed': len(results) - applied}
@@ -0,0 +1,180 @@
+# File: food_io.py
+# Nhập/xuất hàng loạt thực phẩm dạng CSV hoặc NDJSON (mỗi dòng một JSON).
+# Dữ liệu được đọc và ghi theo luồng (từng dòng), chèn vào database theo lô
+# nên file lớn không phải nằm trọn trong bộ nhớ và không cần mỗi món một commit.
+import csv
+import io
+import json
+import math
+from datetime import datetime
+
+from extensions import db
+from models import Food, normalize_ingredient
+from nutrition import classify_food
+
+FIELDS = ['name', 'quantity', 'unit', 'location', 'expiration_date']
+DEFAULT_LOCATION = 'Ngăn mát'
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(filename=None, mimetype=None, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (mimetype or ''):
+        return 'ndjson'
+    if name.endswith('.csv') or 'csv' in (mimetype or ''):
+        return 'csv'
+    return default
+
+
+def iter_records(stream, fmt):
+    # Trả về (số dòng, bản ghi) hoặc (số dòng, thông báo lỗi) cho từng dòng dữ liệu.
+    # File hỏng (sai mã hóa UTF-8, CSV lỗi cú pháp) thì dừng với (None, thông báo lỗi)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield line_no, 'JSON không hợp lệ'
+                    continue
+                yield line_no, record if isinstance(record, dict) else 'Mỗi dòng phải là một đối tượng JSON'
+    except UnicodeDecodeError:
+        yield None, 'File không phải văn bản UTF-8'
+    except csv.Error as e:
+        yield None, f'File CSV không hợp lệ: {e}'
+
+
+def parse_quantity(value):
+    # Số lượng phải là số hữu hạn lớn hơn 0 ("inf"/"nan" sẽ làm hỏng JSON trả về)
+    try:
+        quantity = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('Số lượng không hợp lệ')
+    if not math.isfinite(quantity) or quantity <= 0:
+        raise ValueError('Số lượng phải là số lớn hơn 0')
+    return quantity
+
+
+def parse_fields(record, fields=FIELDS):
+    # Kiểm tra các trường trong fields của một bản ghi, trả về dict giá trị đã chuẩn hóa
+    values = {}
+    if 'name' in fields:
+        name = str(record.get('name') or '').strip()
+        if not name:
+            raise ValueError('Thiếu tên thực phẩm')
+        values['name'] = name[:100]
+    if 'unit' in fields:
+        unit = str(record.get('unit') or '').strip()
+        if not unit:
+            raise ValueError('Thiếu đơn vị')
+        values['unit'] = unit[:20]
+    if 'quantity' in fields:
+        values['quantity'] = parse_quantity(record.get('quantity'))
+    if 'location' in fields:
+        values['location'] = str(record.get('location') or DEFAULT_LOCATION).strip()[:50]
+    if 'expiration_date' in fields:
+        try:
+            values['expiration_date'] = datetime.strptime(str(record.get('expiration_date')).strip(), '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError('Ngày hết hạn phải có dạng YYYY-MM-DD')
+    if 'name' in values:
+        values['nutrition_group'] = classify_food(values['name'])
+        values['normalized_name'] = normalize_ingredient(values['name'])
+    return values
+
+
+def parse_food(record, uid):
+    # Kiểm tra và chuyển một bản ghi thành dict sẵn sàng để INSERT
+    values = parse_fields(record)
+    values.update(added_at=datetime.utcnow(), user_id=uid)
+    return values
+
+
+def import_foods(stream, fmt, uid, batch_size=1000, result=None):
+    """Nhập thực phẩm theo lô, mỗi lô một commit. result (nếu truyền vào) được cập nhật
+    dần, nên người gọi vẫn biết đã ghi bao nhiêu dòng khi việc nhập dừng giữa chừng.
+    Lỗi của cả file (không đọc tiếp được) nằm ở result['error']."""
+    if result is None:
+        result = {}
+    result.update(inserted=0, failed=0, errors=[])
+
+    def report(line_no, message):
+        result['failed'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append({'line': line_no, 'error': message})
+
+    def flush(batch):
+        # Mỗi lô là một transaction; lô lỗi được hoàn tác và báo lỗi cho từng dòng
+        try:
+            db.session.execute(db.insert(Food), [row for _, row in batch])
+            db.session.commit()
+            result['inserted'] += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            for line_no, _ in batch:
+                report(line_no, f'Lỗi database: {e.__class__.__name__}')
+
+    batch = []
+    for line_no, record in iter_records(stream, fmt):
+        if line_no is None:
+            result['error'] = record
+            break
+        if isinstance(record, str):
+            report(line_no, record)
+            continue
+        try:
+            batch.append((line_no, parse_food(record, uid)))
+        except ValueError as e:
+            report(line_no, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return result
+
+
+def food_to_json(food, today):
+    # Dạng JSON của một thực phẩm (dùng cho /foods.json và /foods/batch)
+    return {
+        "id": food.id,
+        "name": food.name,
+        "quantity": food.quantity,
+        "unit": food.unit,
+        "location": food.location,
+        "expiration_date": food.expiration_date.isoformat(),
+        "days_left": (food.expiration_date - today).days
+    }
+
+
+def export_foods(uid, fmt, chunk_rows=500):
+    # Generator: đọc từng lô dòng từ database và trả ra từng đoạn văn bản
+    rows = (db.session.query(Food.name, Food.quantity, Food.unit, Food.location, Food.expiration_date)
+            .filter(Food.user_id == uid).order_by(Food.id).yield_per(1000))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(FIELDS)
+
+    for i, (name, quantity, unit, location, expiration_date) in enumerate(rows, start=1):
+        if writer:
+            writer.writerow([name, quantity, unit, location, expiration_date.isoformat()])
+        else:
+            buffer.write(json.dumps({
+                'name': name, 'quantity': quantity, 'unit': unit,
+                'location': location, 'expiration_date': expiration_date.isoformat()
+            }, ensure_ascii=False) + '\n')
+        if i % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,54 @@
+# File: food_queries.py
+# Truy vấn danh sách thực phẩm theo trang (keyset pagination).
+# Sắp xếp theo (expiration_date, id) và dùng chỉ mục (user_id, expiration_date, id)
+# nên mỗi trang chỉ đọc đúng số dòng cần thiết, kể cả khi tủ có hàng nghìn món.
+from datetime import date, timedelta
+
+from sqlalchemy import and_, or_
+
+from models import Food
+
+SOON_DAYS = 3  # Còn <= 3 ngày thì coi là sắp hết hạn
+EXPIRY_BUCKETS = ('expired', 'soon', 'fresh')
+
+
+def bucket_filter(bucket, today):
+    # Phân loại hạn dùng ngay trong SQL bằng so sánh ngày (dùng được chỉ mục)
+    soon_limit = today + timedelta(days=SOON_DAYS)
+    if bucket == 'expired':
+        return Food.expiration_date < today
+    if bucket == 'soon':
+        return and_(Food.expiration_date >= today, Food.expiration_date <= soon_limit)
+    if bucket == 'fresh':
+        return Food.expiration_date > soon_limit
+    raise ValueError(f'Nhóm hạn dùng không hợp lệ: {bucket}')
+
+
+def make_cursor(food):
+    return f'{food.expiration_date.isoformat()}_{food.id}'
+
+
+def parse_cursor(cursor):
+    # Cursor có dạng "YYYY-MM-DD_id"; trả về None nếu không hợp lệ
+    try:
+        day, food_id = cursor.split('_')
+        return date.fromisoformat(day), int(food_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def list_foods(uid, today, after=None, location=None, bucket=None, limit=50):
+    query = Food.query.filter(Food.user_id == uid)
+    if location:
+        query = query.filter(Food.location == location)
+    if bucket:
+        query = query.filter(bucket_filter(bucket, today))
+    if after:
+        last_date, last_id = after
+        query = query.filter(or_(Food.expiration_date > last_date,
+                                 and_(Food.expiration_date == last_date, Food.id > last_id)))
+
+    # Lấy dư 1 dòng để biết còn trang sau hay không
+    rows = query.order_by(Food.expiration_date.asc(), Food.id.asc()).limit(limit + 1).all()
+    next_cursor = make_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,189 @@
+# File: food_stats.py
+# Bộ đếm thống kê theo user (bảng FoodStat): số thực phẩm theo vị trí, nhóm dinh
+# dưỡng và nhóm hạn dùng. Thêm/sửa/xóa một thực phẩm chỉ cộng trừ vài bộ đếm trong
+# cùng transaction, nên trang Thống kê đọc vài dòng dù tủ có bao nhiêu món.
+# Nhóm hạn dùng phụ thuộc vào ngày: User.stats_as_of ghi ngày mà các bộ đếm đó được
+# tính theo, sang ngày mới thì được tính lại (job hằng ngày hoặc khi user mở trang).
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from food_queries import EXPIRY_BUCKETS, SOON_DAYS, bucket_filter
+from models import Food, FoodStat, User
+
+LOCATION, NUTRITION, BUCKET = 'location', 'nutrition', 'bucket'
+
+# Ảnh chụp các cột của một Food trước/sau khi sửa (đọc sau khi flush)
+FoodState = namedtuple('FoodState', 'id name location nutrition_group expiration_date')
+
+
+def food_state(food):
+    return FoodState(food.id, food.name, food.location, food.nutrition_group, food.expiration_date)
+
+
+def bucket_of(expiration_date, today):
+    if expiration_date < today:
+        return 'expired'
+    if expiration_date <= today + timedelta(days=SOON_DAYS):
+        return 'soon'
+    return 'fresh'
+
+
+def stat_keys(state, today):
+    keys = [(LOCATION, state.location or ''), (BUCKET, bucket_of(state.expiration_date, today))]
+    if state.nutrition_group:
+        keys.append((NUTRITION, state.nutrition_group))
+    return keys
+
+
+# -----------------------------------------------------------
+# TÍNH LẠI TỪ BẢNG FOOD (dựng lần đầu, sang ngày mới, sửa sai lệch)
+# -----------------------------------------------------------
+
+def _count_queries(user_ids, today, dimensions):
+    # Các câu SELECT (user_id, dimension, key, count) đếm trực tiếp từ Food
+    mine = Food.user_id.in_(user_ids)
+    if LOCATION in dimensions:
+        location = func.coalesce(Food.location, literal_column("''"))
+        yield (db.select(Food.user_id, literal(LOCATION), location, func.count(Food.id))
+               .where(mine).group_by(Food.user_id, location))
+    if NUTRITION in dimensions:
+        yield (db.select(Food.user_id, literal(NUTRITION), Food.nutrition_group, func.count(Food.id))
+               .where(mine, Food.nutrition_group.isnot(None)).group_by(Food.user_id, Food.nutrition_group))
+    if BUCKET in dimensions:
+        # Mỗi nhóm một câu, lọc theo khoảng ngày nên dùng được chỉ mục (user_id, expiration_date)
+        for bucket in EXPIRY_BUCKETS:
+            yield (db.select(Food.user_id, literal(BUCKET), literal(bucket), func.count(Food.id))
+                   .where(mine, bucket_filter(bucket, today)).group_by(Food.user_id))
+
+
+def rebuild(user_ids, today, dimensions=(LOCATION, NUTRITION, BUCKET)):
+    # Xóa rồi đếm lại các bộ đếm của nhóm user, trong transaction của người gọi
+    if not user_ids:
+        return
+    db.session.execute(db.delete(FoodStat).where(FoodStat.user_id.in_(user_ids),
+                                                 FoodStat.dimension.in_(dimensions)))
+    for query in _count_queries(user_ids, today, dimensions):
+        db.session.execute(db.insert(FoodStat).from_select(['user_id', 'dimension', 'key', 'count'], query))
+    db.session.execute(db.update(User).where(User.id.in_(user_ids)).values(stats_as_of=today))
+
+
+def refresh(user_ids, today):
+    # Sang ngày mới: chỉ nhóm hạn dùng phải tính lại. User chưa có bộ đếm thì dựng đủ.
+    as_of = dict(db.session.query(User.id, User.stats_as_of).filter(User.id.in_(user_ids)))
+    rebuild([uid for uid in user_ids if as_of.get(uid) is None], today)
+    rebuild([uid for uid in user_ids if as_of.get(uid) is not None], today, dimensions=(BUCKET,))
+
+
+def ensure_fresh(uid, today):
+    # Có thể commit: gọi trước khi tải các đối tượng ORM dùng cho trang
+    if db.session.query(User.stats_as_of).filter_by(id=uid).scalar() != today:
+        refresh([uid], today)
+        db.session.commit()
+
+
+def invalidate_all():
+    # Dữ liệu Food bị sửa hàng loạt ngoài các đường thêm/sửa/xóa: dựng lại khi cần
+    db.session.execute(db.update(User).values(stats_as_of=None))
+    db.session.commit()
+
+
+# -----------------------------------------------------------
+# CẬP NHẬT TĂNG DẦN
+# -----------------------------------------------------------
+
+def _add(uid, deltas):
+    # Cộng deltas {(dimension, key): số} vào bộ đếm, tạo dòng mới nếu chưa có
+    rows = [{'user_id': uid, 'dimension': dimension, 'key': key, 'count': n}
+            for (dimension, key), n in deltas.items() if n]
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect == 'sqlite' else postgresql).insert(FoodStat)
+        upsert = insert.on_conflict_do_update(
+            index_elements=['user_id', 'dimension', 'key'],
+            set_={'count': FoodStat.count + insert.excluded['count']})
+        db.session.execute(upsert, rows)
+        return
+    for row in rows:
+        updated = db.session.execute(
+            db.update(FoodStat)
+            .where(FoodStat.user_id == uid, FoodStat.dimension == row['dimension'], FoodStat.key == row['key'])
+            .values(count=FoodStat.count + row['count'])).rowcount
+        if not updated:
+            db.session.execute(db.insert(FoodStat).values(**row))
+
+
+def apply_changes(uid, changes, today):
+    """Cộng trừ bộ đếm cho các thay đổi [(before, after)] của user: before=None khi
+    thêm mới, after=None khi xóa. Gọi sau khi flush thay đổi Food, trước khi commit."""
+    as_of = db.session.query(User.stats_as_of).filter_by(id=uid).scalar()
+    dimensions = (LOCATION, NUTRITION, BUCKET)
+    if as_of != today:
+        refresh([uid], today)
+        if as_of is None:
+            return  # Vừa dựng đủ từ Food, đã gồm các thay đổi này
+        dimensions = (LOCATION, NUTRITION)  # Nhóm hạn dùng vừa được đếm lại, đã gồm các thay đổi này
+    deltas = Counter()
+    for before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state is not None:
+                for key in stat_keys(state, today):
+                    if key[0] in dimensions:
+                        deltas[key] += sign
+    _add(uid, deltas)
+
+
+# -----------------------------------------------------------
+# ĐỌC VÀ KIỂM TRA
+# -----------------------------------------------------------
+
+def summary(uid, today):
+    # {'as_of': ngày, 'location': {...}, 'nutrition': {...}, 'bucket': {...}} bằng một truy vấn
+    ensure_fresh(uid, today)
+    result = {'as_of': today, LOCATION: {}, NUTRITION: {}, BUCKET: {}}
+    for dimension, key, count in (db.session.query(FoodStat.dimension, FoodStat.key, FoodStat.count)
+                                  .filter(FoodStat.user_id == uid, FoodStat.count != 0)
+                                  .order_by(FoodStat.dimension, FoodStat.key)):
+        result[dimension][key] = count
+    return result
+
+
+def _counts(rows):
+    counts = {}
+    for uid, dimension, key, count in rows:
+        if count:
+            counts.setdefault(uid, {})[(dimension, key)] = count
+    return counts
+
+
+def check(today, batch_size=500):
+    """So bộ đếm đã lưu với số đếm lại từ Food. Trả về (số user đã kiểm tra,
+    danh sách id user bị sai lệch). User chưa có bộ đếm được bỏ qua."""
+    checked, mismatched, last_id = 0, [], 0
+    while True:
+        users = (db.session.query(User.id, User.stats_as_of).filter(User.id > last_id)
+                 .order_by(User.id).limit(batch_size).all())
+        if not users:
+            return checked, mismatched
+        built = {uid: as_of for uid, as_of in users if as_of is not None}
+        ids = list(built)
+        expected = _counts(row for query in _count_queries(ids, today, (LOCATION, NUTRITION, BUCKET))
+                           for row in db.session.execute(query))
+        stored = _counts(db.session.query(FoodStat.user_id, FoodStat.dimension, FoodStat.key, FoodStat.count)
+                         .filter(FoodStat.user_id.in_(ids)))
+        for uid, as_of in built.items():
+            want, have = expected.get(uid, {}), stored.get(uid, {})
+            if as_of != today:
+                # Nhóm hạn dùng được tính theo ngày khác: chỉ so vị trí và dinh dưỡng
+                want = {k: v for k, v in want.items() if k[0] != BUCKET}
+                have = {k: v for k, v in have.items() if k[0] != BUCKET}
+            if want != have:
+                mismatched.append(uid)
+        checked += len(users)
+        last_id = users[-1][0]
+        db.session.rollback()  # Không giữ transaction đọc mở giữa các lô
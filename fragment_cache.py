@@ -0,0 +1,63 @@
+# File: fragment_cache.py
+# Cache HTML của từng thẻ công thức (trang Gợi ý và trang Tài khoản).
+# Thẻ chỉ phụ thuộc vào nội dung công thức và trạng thái tim của user, nên mỗi
+# (id, updated_at, đã thích hay chưa) được render một lần rồi dùng lại cho mọi
+# user và mọi request. Danh sách thẻ được ghép trong Python thay vì vòng lặp
+# Jinja, vì với danh mục lớn chính vòng lặp template là phần tốn thời gian nhất.
+# Danh sách luôn được duyệt theo cùng thứ tự, nên khi dài hơn sức chứa thì chỉ
+# max_size thẻ đầu được cache: LRU nhỏ hơn danh sách sẽ đẩy ra đúng thẻ sắp cần
+# tới ở lượt sau và không bao giờ trúng.
+import threading
+
+from markupsafe import Markup
+
+from suggest_cache import MemoryBackend
+
+
+class FragmentCache:
+    def __init__(self, max_size=10000):
+        self.backend = MemoryBackend(max_size)
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend.max_size = app.config.setdefault('FRAGMENT_CACHE_SIZE', 10000)
+        app.jinja_env.globals['cached_cards'] = self.render_cards
+
+    def render_cards(self, name, recipes, macro, fav_ids=()):
+        """Ghép HTML của macro(recipe, is_fav) cho cả danh sách.
+        recipe cần có id và updated_at (Recipe hoặc RecipeCard)."""
+        fav_ids = set(fav_ids)
+        parts, misses, bypassed = [], 0, 0
+        for position, recipe in enumerate(recipes):
+            is_fav = recipe.id in fav_ids
+            if position >= self.backend.max_size:
+                parts.append(macro(recipe, is_fav))
+                bypassed += 1
+                continue
+            key = (name, recipe.id, recipe.updated_at, is_fav)
+            html = self.backend.get(key)
+            if html is None:
+                html = macro(recipe, is_fav)
+                self.backend.set(key, html)
+                misses += 1
+            parts.append(html)
+        with self._lock:
+            self.misses += misses
+            self.bypassed += bypassed
+            self.hits += len(parts) - misses - bypassed
+        return Markup(''.join(parts))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            'size': self.backend.size(),
+            'max_size': self.backend.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+        }
@@ -0,0 +1,47 @@
+# File: gunicorn.conf.py
+# Chạy: gunicorn (file này được gunicorn tự đọc từ thư mục hiện tại, app nằm ở wsgi.py).
+# preload_app: master gọi create_app() một lần (kể cả bước warm-up), các worker
+# được fork ra đã có sẵn mapper, template đã biên dịch và chỉ mục công thức.
+import os
+import time
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+# Cache "memory" nằm riêng trong từng worker: thay đổi ở worker này không xóa được gợi ý
+# đã lưu ở worker kia. Nhiều worker thì mặc định dùng cache SQLite chung (file này được
+# đọc trước khi nạp app, nên create_app() thấy giá trị này).
+if workers > 1:
+    os.environ.setdefault("SUGGEST_CACHE_BACKEND", "sqlite")
+
+
+def on_starting(server):
+    if workers > 1 and os.environ.get("SUGGEST_CACHE_BACKEND") == "memory":
+        server.log.warning("SUGGEST_CACHE_BACKEND=memory với %d worker: gợi ý đã lưu ở worker khác "
+                           "sẽ không bị xóa khi dữ liệu đổi. Nên dùng sqlite hoặc none.", workers)
+
+
+def when_ready(server):
+    if preload_app:
+        from extensions import metrics
+        server.log.info("App nạp sẵn ở master: %s",
+                        ", ".join(f"{phase}={seconds:.3f}s" for phase, seconds in metrics.startup.items()))
+
+
+def post_fork(server, worker):
+    from extensions import metrics
+    metrics.mark_boot()
+    if preload_app:
+        # Kết nối trong pool được tạo ở master không được dùng chung giữa các process
+        from wsgi import app
+        from extensions import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from extensions import metrics
+    metrics.record_startup("worker_boot", time.time() - metrics.boot_time)
+    worker.log.info("Worker %d sẵn sàng sau %.3f s", worker.pid, metrics.startup["worker_boot"])
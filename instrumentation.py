@@ -0,0 +1,200 @@
+# File: instrumentation.py
+# Đo hiệu năng từng request: độ trễ theo route, số câu SQL và tổng thời gian SQL
+# (qua event của SQLAlchemy engine), thời gian render template. Cùng với đó là
+# thời gian khởi động (create_app, warm-up, boot worker) và thời gian tới request đầu.
+# Số liệu được xuất ở dạng văn bản Prometheus tại /metrics. Mỗi process (worker
+# gunicorn) giữ số liệu riêng của nó.
+import os
+import threading
+import time
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Ô cuối là +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        out, cumulative = [], 0
+        for bound, n in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+        out.append(f'{name}_sum{_labels(labels)} {self.sum}')
+        out.append(f'{name}_count{_labels(labels)} {self.count}')
+        return out
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    items = dict(labels, **extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items.items()) + '}'
+
+
+class Metrics:
+    # (tên metric, mô tả, các mốc bucket)
+    HISTOGRAMS = {
+        'request_duration_seconds': ('Độ trễ request theo route', LATENCY_BUCKETS),
+        'request_sql_queries': ('Số câu SQL mỗi request', QUERY_COUNT_BUCKETS),
+        'request_sql_seconds': ('Tổng thời gian SQL mỗi request', LATENCY_BUCKETS),
+        'template_render_seconds': ('Thời gian render template', LATENCY_BUCKETS),
+    }
+
+    def __init__(self, prefix='smartfridge'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._requests = {}          # (endpoint, method, status) -> số request
+        self._over_budget = {}       # endpoint -> số request vượt ngân sách truy vấn
+        self._gauge_sources = []     # (tiền tố, hàm trả về dict số liệu)
+        self.query_budget = 0
+        self.startup = {}            # giai đoạn khởi động -> số giây
+        self.mark_boot()
+
+    def mark_boot(self):
+        # Mốc bắt đầu của process (gọi lại trong worker ngay sau khi gunicorn fork)
+        self.boot_time = time.time()
+        self.boot_pid = os.getpid()
+        self.first_request_seconds = None
+
+    def record_startup(self, phase, seconds):
+        self.startup[phase] = seconds
+
+    def init_app(self, app, db):
+        self.query_budget = app.config.setdefault('QUERY_BUDGET', 0)  # 0 = không cảnh báo
+        self.logger = app.logger
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor)
+
+    def add_gauge_source(self, prefix, fn):
+        # fn() trả về dict {tên: số}; các giá trị không phải số sẽ bị bỏ qua.
+        # Cùng tiền tố thì thay nguồn cũ (create_app() được gọi lại)
+        self._gauge_sources = [(p, f) for p, f in self._gauge_sources if p != prefix]
+        self._gauge_sources.append((prefix, fn))
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            hist = self._histograms[name].get(key)
+            if hist is None:
+                hist = self._histograms[name][key] = Histogram(self.HISTOGRAMS[name][1])
+            hist.observe(value)
+
+    # --- Hook của Flask/SQLAlchemy ---
+
+    def _start_request(self):
+        if self.first_request_seconds is None and self.boot_pid == os.getpid():
+            self.first_request_seconds = time.time() - self.boot_time
+            self.logger.info('Request đầu tiên của process %d sau %.3f s', self.boot_pid,
+                             self.first_request_seconds)
+        g._perf = {'start': time.perf_counter(), 'queries': 0, 'sql_seconds': 0.0, 'render_stack': []}
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['_query_start'].pop()
+        perf = g.get('_perf') if has_request_context() else None
+        if perf is not None:
+            perf['queries'] += 1
+            perf['sql_seconds'] += elapsed
+
+    def _before_render(self, sender, template, context, **extra):
+        perf = g.get('_perf')
+        if perf is not None:
+            perf['render_stack'].append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        perf = g.get('_perf')
+        if perf is not None and perf['render_stack']:
+            self.observe('template_render_seconds', time.perf_counter() - perf['render_stack'].pop(),
+                         template=template.name or '')
+
+    def _finish_request(self, response):
+        perf = g.pop('_perf', None)
+        if perf is None:
+            return response
+        endpoint = request.endpoint or 'unknown'
+        if endpoint == 'main.metrics':
+            return response
+        elapsed = time.perf_counter() - perf['start']
+        self.observe('request_duration_seconds', elapsed, endpoint=endpoint)
+        self.observe('request_sql_queries', perf['queries'], endpoint=endpoint)
+        self.observe('request_sql_seconds', perf['sql_seconds'], endpoint=endpoint)
+        with self._lock:
+            key = (endpoint, request.method, response.status_code)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+        if self.query_budget and perf['queries'] > self.query_budget:
+            with self._lock:
+                self._over_budget[endpoint] = self._over_budget.get(endpoint, 0) + 1
+            self.logger.warning('Request %s %s chạy %d câu SQL (ngân sách %d, %.1f ms SQL, %.1f ms tổng)',
+                                request.method, request.path, perf['queries'], self.query_budget,
+                                perf['sql_seconds'] * 1000, elapsed * 1000)
+        return response
+
+    # --- Xuất số liệu ---
+
+    def render(self):
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines += [f'# HELP {p}_requests_total Số request theo route', f'# TYPE {p}_requests_total counter']
+            for (endpoint, method, status), n in sorted(self._requests.items()):
+                lines.append(f'{p}_requests_total{_labels({"endpoint": endpoint, "method": method, "status": status})} {n}')
+            lines += [f'# HELP {p}_query_budget_exceeded_total Số request vượt ngân sách truy vấn',
+                      f'# TYPE {p}_query_budget_exceeded_total counter']
+            for endpoint, n in sorted(self._over_budget.items()):
+                lines.append(f'{p}_query_budget_exceeded_total{_labels({"endpoint": endpoint})} {n}')
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines += [f'# HELP {p}_{name} {help_text}', f'# TYPE {p}_{name} histogram']
+                for key, hist in sorted(self._histograms[name].items()):
+                    lines += hist.lines(f'{p}_{name}', dict(key))
+
+        lines += [f'# HELP {p}_startup_seconds Thời gian từng giai đoạn khởi động',
+                  f'# TYPE {p}_startup_seconds gauge']
+        for phase, seconds in self.startup.items():
+            lines.append(f'{p}_startup_seconds{_labels({"phase": phase})} {seconds}')
+        lines += [f'# TYPE {p}_process_boot_time_seconds gauge', f'{p}_process_boot_time_seconds {self.boot_time}']
+        if self.first_request_seconds is not None:
+            lines += [f'# HELP {p}_time_to_first_request_seconds Từ lúc process/worker khởi động tới request đầu',
+                      f'# TYPE {p}_time_to_first_request_seconds gauge',
+                      f'{p}_time_to_first_request_seconds {self.first_request_seconds}']
+
+        for prefix, fn in self._gauge_sources:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines += [f'# TYPE {p}_{prefix}_{key} gauge', f'{p}_{prefix}_{key} {value}']
+        return '\n'.join(lines) + '\n'
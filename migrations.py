@@ -0,0 +1,109 @@
+# File: migrations.py
+# Nâng cấp schema và chuyển dữ liệu cũ sang cấu trúc mới (chạy được nhiều lần)
+from sqlalchemy import inspect
+
+from extensions import data_versions, db, suggestion_cache
+from models import Food, Recipe, RecipeIngredient, normalize_ingredient, split_ingredients
+from nutrition import classify_food
+import food_stats
+
+
+def upgrade_db(batch_size=1000):
+    """Nâng cấp schema rồi chuyển dữ liệu cũ, chỉ xử lý các dòng còn thiếu nên chạy lại
+    bao nhiêu lần cũng được (dùng cho "flask upgrade-db" và DB_AUTO_UPGRADE).
+    Trả về số dòng đã chuyển ở từng bước."""
+    upgrade_schema()
+    counts = {
+        'recipes': backfill_recipe_ingredients(batch_size, only_missing=True),
+        'foods': backfill_normalized_names(batch_size),
+        'nutrition': backfill_nutrition_groups(batch_size, only_missing=True),
+    }
+    if counts['nutrition']:
+        food_stats.invalidate_all()  # Bộ đếm nhóm dinh dưỡng được dựng lại khi cần
+        data_versions.bump_all()
+        db.session.commit()
+    if counts['recipes'] or counts['foods']:
+        suggestion_cache.clear()
+    return counts
+
+
+def upgrade_schema():
+    # Tạo các bảng còn thiếu, rồi bổ sung cột/chỉ mục mới cho các bảng đã có
+    db.create_all()
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}')
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def backfill_recipe_ingredients(batch_size=1000, only_missing=False):
+    # Tách Recipe.ingredients_list thành các dòng RecipeIngredient, theo từng lô id
+    # để không phải giữ cả danh mục trong bộ nhớ hay khóa bảng quá lâu.
+    # only_missing: chỉ các công thức chưa có dòng RecipeIngredient nào
+    last_id, total = 0, 0
+    while True:
+        query = db.session.query(Recipe.id, Recipe.ingredients_list).filter(Recipe.id > last_id)
+        if only_missing:
+            query = query.filter(~db.session.query(RecipeIngredient.recipe_id)
+                                 .filter(RecipeIngredient.recipe_id == Recipe.id).exists())
+        batch = query.order_by(Recipe.id).limit(batch_size).all()
+        if not batch:
+            break
+        ids = [rid for rid, _ in batch]
+        db.session.query(RecipeIngredient).filter(RecipeIngredient.recipe_id.in_(ids)).delete(synchronize_session=False)
+        db.session.execute(db.insert(RecipeIngredient), [
+            {'recipe_id': rid, 'position': i, 'normalized_name': name}
+            for rid, ingredients_list in batch
+            for i, name in enumerate(split_ingredients(ingredients_list))
+        ])
+        db.session.commit()
+        last_id = ids[-1]
+        total += len(batch)
+    return total
+
+
+def backfill_normalized_names(batch_size=1000):
+    # Điền Food.normalized_name cho các dòng có từ trước khi thêm cột
+    last_id, total = 0, 0
+    while True:
+        batch = (db.session.query(Food.id, Food.name)
+                 .filter(Food.id > last_id, Food.normalized_name.is_(None))
+                 .order_by(Food.id).limit(batch_size).all())
+        if not batch:
+            break
+        db.session.execute(db.update(Food), [
+            {'id': fid, 'normalized_name': normalize_ingredient(name)} for fid, name in batch
+        ])
+        db.session.commit()
+        last_id = batch[-1][0]
+        total += len(batch)
+    return total
+
+
+def backfill_nutrition_groups(batch_size=1000, only_missing=False):
+    # Tính lại Food.nutrition_group cho các dòng đã có trước khi thêm cột.
+    # only_missing: chỉ các dòng chưa có nhóm, và chỉ đếm các dòng phân loại được
+    # (món không thuộc nhóm nào giữ NULL, lần chạy sau không tính là thay đổi)
+    last_id, total = 0, 0
+    while True:
+        query = db.session.query(Food.id, Food.name).filter(Food.id > last_id)
+        if only_missing:
+            query = query.filter(Food.nutrition_group.is_(None))
+        batch = query.order_by(Food.id).limit(batch_size).all()
+        if not batch:
+            break
+        rows = [{'id': fid, 'nutrition_group': classify_food(name)} for fid, name in batch]
+        if only_missing:
+            rows = [row for row in rows if row['nutrition_group'] is not None]
+        if rows:
+            db.session.execute(db.update(Food), rows)
+        db.session.commit()
+        last_id = batch[-1][0]
+        total += len(rows)
+    return total
@@ -1,6 +1,18 @@
 # File: models.py
 from extensions import db
 from datetime import datetime
+from sqlalchemy import event
+from nutrition import classify_food
+
+
+# Chuẩn hóa tên nguyên liệu (dùng chung cho chỉ mục, bảng RecipeIngredient và truy vấn SQL)
+def normalize_ingredient(name):
+    return name.strip().lower()
+
+
+def split_ingredients(ingredients_list):
+    # Giữ nguyên thứ tự và các phần tử trùng lặp như cách tính điểm cũ
+    return [normalize_ingredient(i) for i in ingredients_list.split(',')]
 
 # 1. Bảng User (Người dùng)
 class User(db.Model):
@@ -9,6 +21,11 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)   # Email
     password_hash = db.Column(db.String(128), nullable=False)        # Mật khẩu đã mã hóa
     created_at = db.Column(db.DateTime, default=datetime.utcnow)     # Ngày tạo tài khoản
+    expiry_as_of = db.Column(db.Date)  # Ngày bảng ExpiringItem của user được làm mới gần nhất
+    stats_as_of = db.Column(db.Date)   # Ngày mà nhóm hạn dùng trong FoodStat được tính theo (None = chưa dựng)
+    # Phiên bản dữ liệu Food/Favorite cho ETag (xem data_versions.py), đổi sau mỗi thay đổi
+    data_version = db.Column(db.String(12))
+    data_changed_at = db.Column(db.DateTime)
     
     # Quan hệ: Một User có nhiều Food (User 1 - N Food)
     # lazy=True giúp tải dữ liệu thực phẩm khi cần thiết
@@ -26,13 +43,31 @@ class Food(db.Model):
     expiration_date = db.Column(db.Date, nullable=False) # Ngày hết hạn
     location = db.Column(db.String(50), default='Ngăn mát') # Vị trí
     added_at = db.Column(db.DateTime, default=datetime.utcnow)      # Ngày thêm vào
+    nutrition_group = db.Column(db.String(20))  # Nhóm dinh dưỡng, tính sẵn khi tên thay đổi
+    # Tên đã chuẩn hóa bằng normalize_ingredient (để SQL so khớp với RecipeIngredient;
+    # lower() của SQLite chỉ đổi chữ ASCII nên không tự chuẩn hóa được "Ức gà")
+    normalized_name = db.Column(db.String(100))
     
     # Khóa ngoại: Liên kết với bảng User
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_food_user_nutrition', 'user_id', 'nutrition_group'),
+        # Phục vụ danh sách theo trang sắp xếp theo hạn dùng (có/không lọc vị trí)
+        db.Index('ix_food_user_expiry', 'user_id', 'expiration_date', 'id'),
+        db.Index('ix_food_user_location_expiry', 'user_id', 'location', 'expiration_date', 'id'),
+    )
+
     def __repr__(self):
         return f"Food('{self.name}', '{self.expiration_date}')"
 
+
+@event.listens_for(Food.name, 'set')
+def _classify_food_name(target, value, oldvalue, initiator):
+    if value != oldvalue:
+        target.nutrition_group = classify_food(value)
+        target.normalized_name = normalize_ingredient(value) if value is not None else None
+
 # 3. Bảng Recipe (Công thức nấu ăn - Dành cho tính năng gợi ý)
 class Recipe(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -44,6 +79,16 @@ class Recipe(db.Model):
     # Ví dụ: "Thịt gà, Nấm hương, Hành tây"
     ingredients_list = db.Column(db.Text, nullable=False) 
 
+    # Phục vụ nạp danh mục kiểu upsert: mã ổn định từ nguồn dữ liệu và băm nội dung
+    external_id = db.Column(db.String(64), unique=True, index=True)
+    content_hash = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Bản chuẩn hóa của ingredients_list, được đồng bộ tự động khi gán chuỗi
+    ingredients = db.relationship('RecipeIngredient', backref='recipe', lazy=True,
+                                  cascade='all, delete-orphan', passive_deletes=True,
+                                  order_by='RecipeIngredient.position')
+
     def __repr__(self):
         return f"Recipe('{self.name}')"
     
@@ -55,4 +100,74 @@ class Favorite(db.Model):
     recipe = db.relationship('Recipe', backref='favorited_by')
 
     # Đảm bảo một user không yêu thích 1 món 2 lần
-    __table_args__ = (db.UniqueConstraint('user_id', 'recipe_id', name='_user_recipe_uc'),)
\ No newline at end of file
+    __table_args__ = (db.UniqueConstraint('user_id', 'recipe_id', name='_user_recipe_uc'),)
+
+# 5. Bảng RecipeIngredient (Nguyên liệu đã chuẩn hóa, mỗi dòng một nguyên liệu)
+# Cho phép database đánh chỉ mục và JOIN theo nguyên liệu thay vì tách chuỗi trong Python
+class RecipeIngredient(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id', ondelete='CASCADE'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)                # Thứ tự trong chuỗi gốc
+    normalized_name = db.Column(db.String(200), nullable=False)     # Tên đã strip + lower
+
+    __table_args__ = (
+        db.Index('ix_recipe_ingredient_recipe', 'recipe_id', 'position'),
+        db.Index('ix_recipe_ingredient_name', 'normalized_name', 'recipe_id'),
+    )
+
+    def __repr__(self):
+        return f"RecipeIngredient({self.recipe_id}, '{self.normalized_name}')"
+
+
+# 6. Bảng ExpiringItem (Thực phẩm đã/sắp hết hạn, được tính sẵn mỗi ngày)
+# Trang chủ, thống kê và /expiring.json đọc từ đây thay vì quét cả tủ lạnh
+class ExpiringItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    food_id = db.Column(db.Integer, db.ForeignKey('food.id', ondelete='CASCADE'), nullable=False, unique=True)
+    name = db.Column(db.String(100), nullable=False)
+    location = db.Column(db.String(50))
+    expiration_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(10), nullable=False)  # 'expired' hoặc 'soon'
+
+    __table_args__ = (
+        db.Index('ix_expiring_user_status', 'user_id', 'status', 'food_id'),
+    )
+
+    def __repr__(self):
+        return f"ExpiringItem('{self.name}', '{self.status}')"
+
+# 7. Bảng JobState (Tiến độ của các job nền, để chạy tiếp khi bị ngắt giữa chừng)
+class JobState(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    run_date = db.Column(db.Date)                       # Ngày mà lượt chạy hiện tại xử lý
+    last_user_id = db.Column(db.Integer, default=0)     # User cuối cùng đã xử lý xong
+    processed = db.Column(db.Integer, default=0)
+    owner = db.Column(db.String(100))                   # Process đang giữ job (None = rảnh)
+    heartbeat = db.Column(db.DateTime)                  # Lần cuối owner báo còn sống
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"JobState('{self.name}', {self.run_date}, {self.last_user_id})"
+
+# 8. Bảng FoodStat (Bộ đếm thống kê theo user, cộng trừ ngay khi thêm/sửa/xóa thực phẩm)
+# dimension: 'location' | 'nutrition' | 'bucket' (đã hết hạn / sắp hết hạn / còn tốt)
+class FoodStat(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    key = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"FoodStat({self.user_id}, '{self.dimension}', '{self.key}', {self.count})"
+
+
+def build_ingredient_rows(ingredients_list):
+    return [RecipeIngredient(position=i, normalized_name=name)
+            for i, name in enumerate(split_ingredients(ingredients_list))]
+
+
+@event.listens_for(Recipe.ingredients_list, 'set')
+def _sync_recipe_ingredients(target, value, oldvalue, initiator):
+    if value is not None and value != oldvalue:
+        target.ingredients = build_ingredient_rows(value)
@@ -0,0 +1,75 @@
+# File: nutrition.py
+# Phân loại nhóm dinh dưỡng của thực phẩm theo từ khóa trong tên.
+# Các từ khóa được biên dịch một lần thành automaton Aho-Corasick nên mỗi tên
+# chỉ cần quét một lượt, thay vì thử lần lượt từng từ khóa của từng nhóm.
+from collections import deque
+
+# Thứ tự nhóm quan trọng: tên khớp nhiều nhóm thì lấy nhóm đứng trước
+NUTRITION_GROUPS = {
+    'Đạm': ['thịt', 'cá', 'tôm', 'trứng', 'giò', 'chả', 'sườn', 'bò', 'gà'],
+    'Chất xơ': ['rau', 'cải', 'muống', 'ngót', 'bí', 'bầu', 'mướp', 'súp lơ'],
+    'Vitamin': ['quả', 'trái', 'cam', 'táo', 'chuối', 'bơ', 'nho', 'xoài'],
+    'Sữa/Bơ': ['sữa', 'phô mai', 'yogurt', 'váng sữa'],
+    'Tinh bột': ['bánh', 'mỳ', 'miến', 'bún', 'ngô', 'khoai']
+}
+
+
+class KeywordMatcher:
+    """Automaton Aho-Corasick: trả về nhãn có độ ưu tiên cao nhất xuất hiện trong chuỗi."""
+
+    def __init__(self, groups):
+        self.labels = list(groups)
+        self._goto = [{}]       # trạng thái -> {ký tự: trạng thái kế tiếp}
+        self._fail = [0]
+        self._best = [None]     # chỉ số nhãn nhỏ nhất kết thúc tại trạng thái (kể cả qua fail)
+
+        for rank, label in enumerate(self.labels):
+            for keyword in groups[label]:
+                state = 0
+                for ch in keyword:
+                    nxt = self._goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._best.append(None)
+                        self._goto[state][ch] = nxt
+                    state = nxt
+                if self._best[state] is None or rank < self._best[state]:
+                    self._best[state] = rank
+
+        # Dựng liên kết fail theo BFS (các trạng thái độ sâu 1 có fail = gốc)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                inherited = self._best[self._fail[nxt]]
+                if inherited is not None and (self._best[nxt] is None or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+
+    def classify(self, text):
+        state, best = 0, None
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            rank = self._best[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == 0:
+                    break
+        return self.labels[best] if best is not None else None
+
+
+_matcher = KeywordMatcher(NUTRITION_GROUPS)
+
+
+def classify_food(name):
+    if not name:
+        return None
+    return _matcher.classify(name.lower())
@@ -0,0 +1,138 @@
+# File: passwords.py
+# Dịch vụ băm mật khẩu bcrypt chạy trong một pool process có giới hạn.
+# bcrypt tốn CPU theo thiết kế; chạy thẳng trên thread của request thì một đợt
+# đăng nhập dồn dập sẽ chiếm hết worker gunicorn. Ở đây việc băm được đẩy sang
+# pool riêng, số yêu cầu chờ bị giới hạn, và hash cũ được băm lại khi đổi cost.
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt as bcrypt_lib
+
+
+class HasherBusy(Exception):
+    """Hàng đợi băm mật khẩu đã đầy."""
+
+
+def _hash_password(password, rounds):
+    return bcrypt_lib.hashpw(password.encode('utf-8'), bcrypt_lib.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(pw_hash, password):
+    try:
+        return bcrypt_lib.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+    except ValueError:
+        return False  # Hash hỏng hoặc không phải bcrypt
+
+
+def hash_rounds(pw_hash):
+    # "$2b$12$..." -> 12
+    try:
+        return int(pw_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.rounds = 12
+        self.workers = 2
+        self.max_pending = 16
+        self.wait_timeout = 5.0
+        self.pool_kind = 'process'
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        # Số liệu theo dõi
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def init_app(self, app):
+        # BCRYPT_LOG_ROUNDS cũng là cấu hình mà Flask-Bcrypt dùng
+        self.rounds = app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+        self.workers = app.config.setdefault('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+        self.max_pending = app.config.setdefault('PASSWORD_HASH_MAX_PENDING', self.workers * 8)
+        self.wait_timeout = app.config.setdefault('PASSWORD_HASH_TIMEOUT', 5.0)
+        self.pool_kind = app.config.setdefault('PASSWORD_HASH_POOL', 'process')  # process | thread | inline
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_pool(self):
+        # Pool được tạo lười và tạo lại sau khi fork (mỗi worker gunicorn một pool)
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    if self.pool_kind == 'thread':
+                        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pool_pid = os.getpid()
+                    atexit.register(self._pool.shutdown, wait=False)
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy()
+
+        start = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            if self.pool_kind == 'inline':
+                return fn(*args)
+            return self._get_pool().submit(fn, *args).result()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+            self._slots.release()
+
+    def generate(self, password):
+        return self._run(_hash_password, password, self.rounds)
+
+    def check(self, pw_hash, password):
+        return self._run(_check_password, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return hash_rounds(pw_hash) != self.rounds
+
+    def verify_and_update(self, user, password):
+        # Đăng nhập đúng mà hash đang dùng cost cũ thì băm lại với cost hiện tại.
+        # Trả về True nếu mật khẩu đúng; người gọi chịu trách nhiệm commit.
+        if not self.check(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = self.generate(password)
+                with self._lock:
+                    self.rehashed += 1
+            except HasherBusy:
+                pass  # Để lần đăng nhập sau băm lại
+        return True
+
+    def stats(self):
+        return {
+            'pool': self.pool_kind,
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'in_flight': self.in_flight,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed,
+            'avg_seconds': self.total_seconds / self.completed if self.completed else 0.0,
+            'max_seconds': self.max_seconds,
+        }
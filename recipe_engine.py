@@ -0,0 +1,230 @@
+# File: recipe_engine.py
+# Bộ máy khớp công thức cho trang Gợi ý món ăn.
+# Thay vì quét (công thức x nguyên liệu x đồ trong tủ) ở mỗi lượt xem, ta dựng
+# một chỉ mục ngược "nguyên liệu -> công thức" một lần và chỉ chấm điểm các
+# công thức có ít nhất một nguyên liệu trùng với tủ lạnh.
+import heapq
+import threading
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import aliased
+
+from extensions import db
+from models import Food, Recipe, RecipeIngredient, split_ingredients
+
+# Bản chụp gọn nhẹ của một công thức (không gắn với session SQLAlchemy nên
+# có thể dùng lại an toàn giữa các request). updated_at là phiên bản nội dung,
+# dùng làm khóa cho cache phần HTML của thẻ công thức.
+RecipeCard = namedtuple('RecipeCard', ['id', 'name', 'ingredients_list', 'instructions', 'image_url', 'updated_at'],
+                        defaults=(None,))
+
+URGENCY_BONUS = 10      # Điểm thưởng cho mỗi nguyên liệu sắp hết hạn
+MIN_SCORE = 50          # Ngưỡng điểm để một món được gợi ý
+URGENT_DAYS = 3         # Còn <= 3 ngày thì coi là sắp hết hạn
+MATCH_CACHE_SIZE = 10000
+
+
+def rank_suggestions(suggestions, top_k=None):
+    # Yêu thích trước, rồi điểm cao hơn; cùng hạng thì giữ thứ tự id
+    key = lambda s: (not s['is_fav'], -s['score'], s['info'].id)
+    if top_k is not None:
+        return heapq.nsmallest(top_k, suggestions, key=key)
+    return sorted(suggestions, key=key)
+
+
+class RecipeIndex:
+    def __init__(self, rows, signature=None):
+        self.signature = signature
+        self.recipes = []       # RecipeCard theo thứ tự id
+        self.by_id = {}         # recipe_id -> RecipeCard
+        self.ingredients = {}   # recipe_id -> danh sách nguyên liệu đã chuẩn hóa
+        self.postings = {}      # nguyên liệu -> set(recipe_id)
+        self._match_cache = {}
+
+        for row in rows:
+            card = RecipeCard(*row)
+            self.recipes.append(card)
+            self.by_id[card.id] = card
+            needs = split_ingredients(card.ingredients_list)
+            self.ingredients[card.id] = needs
+            for need in needs:
+                self.postings.setdefault(need, set()).add(card.id)
+
+    @classmethod
+    def load(cls, signature=None):
+        rows = db.session.query(
+            Recipe.id, Recipe.name, Recipe.ingredients_list, Recipe.instructions, Recipe.image_url,
+            Recipe.updated_at
+        ).order_by(Recipe.id).yield_per(2000)
+        return cls(rows, signature)
+
+    def _match_item(self, item):
+        # Khớp theo chuỗi con hai chiều như code cũ, nhưng chỉ trên từ điển
+        # nguyên liệu (nhỏ hơn rất nhiều so với tổng số nguyên liệu của mọi món)
+        hit = self._match_cache.get(item)
+        if hit is None:
+            hit = frozenset(need for need in self.postings if item in need or need in item)
+            if len(self._match_cache) >= MATCH_CACHE_SIZE:
+                self._match_cache.clear()
+            self._match_cache[item] = hit
+        return hit
+
+    def matching_ingredients(self, names):
+        matched = set()
+        for item in set(names):
+            matched |= self._match_item(item)
+        return matched
+
+    def score(self, recipe_id, matched, urgent):
+        needs = self.ingredients[recipe_id]
+        matches = [need for need in needs if need in matched]
+        urgency_bonus = URGENCY_BONUS * sum(1 for need in matches if need in urgent)
+        base_score = int((len(matches) / len(needs)) * 100) if needs else 0
+        return matches, base_score, urgency_bonus
+
+    def suggest(self, fridge_names, urgent_names, fav_ids, top_k=None):
+        matched = self.matching_ingredients(fridge_names)
+        urgent = self.matching_ingredients(urgent_names) & matched
+        fav_ids = set(fav_ids)
+
+        candidates = set(rid for rid in fav_ids if rid in self.by_id)
+        for need in matched:
+            candidates |= self.postings[need]
+
+        suggestions = []
+        for rid in candidates:
+            matches, base_score, urgency_bonus = self.score(rid, matched, urgent)
+            total_score = base_score + urgency_bonus
+            is_fav = rid in fav_ids
+            if is_fav or total_score > MIN_SCORE:
+                suggestions.append({
+                    'info': self.by_id[rid],
+                    'score': total_score,
+                    'base_score': base_score,
+                    'is_urgent': urgency_bonus > 0,
+                    'matches': matches,
+                    'missing': set(self.ingredients[rid]) - set(matches),
+                    'is_fav': is_fav
+                })
+
+        return rank_suggestions(suggestions, top_k)
+
+    def browse(self, fav_ids):
+        fav_ids = set(fav_ids)
+        return sorted(self.recipes, key=lambda r: r.id in fav_ids, reverse=True)
+
+
+# -----------------------------------------------------------
+# CHỈ MỤC DÙNG CHUNG TRONG PROCESS
+# -----------------------------------------------------------
+
+_index = None
+_lock = threading.Lock()
+
+
+def catalog_signature():
+    # Truy vấn rẻ để phát hiện danh mục công thức đã thay đổi (kể cả ở worker khác)
+    return tuple(db.session.query(func.count(Recipe.id), func.max(Recipe.id),
+                                  func.max(Recipe.updated_at)).one())
+
+
+def get_recipe_index():
+    global _index
+    signature = catalog_signature()
+    index = _index
+    if index is None or index.signature != signature:
+        with _lock:
+            if _index is None or _index.signature != signature:
+                _index = RecipeIndex.load(signature)
+            index = _index
+    return index
+
+
+def invalidate_recipe_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+# -----------------------------------------------------------
+# GỢI Ý CHẠY TRONG DATABASE (dùng bảng RecipeIngredient)
+# -----------------------------------------------------------
+
+def _contains(haystack, needle):
+    # Kiểm tra chuỗi con phía SQL, tránh LIKE để ký tự % và _ trong tên không bị hiểu sai
+    if db.engine.dialect.name == 'postgresql':
+        return func.strpos(haystack, needle) > 0
+    return func.instr(haystack, needle) > 0
+
+
+def suggest_sql(uid, today, fav_ids, top_k=None):
+    # JOIN nguyên liệu với thực phẩm của user, GROUP BY công thức để đếm số nguyên liệu
+    # khớp; chỉ các món có ít nhất một nguyên liệu trùng mới rời khỏi database.
+    fav_ids = set(fav_ids)
+    food_name = Food.normalized_name  # Chuẩn hóa bằng Python lúc ghi, không dùng lower() của SQL
+    is_soon = and_(Food.expiration_date >= today,
+                   Food.expiration_date <= today + timedelta(days=URGENT_DAYS))
+
+    # 1. So khớp chuỗi con chỉ trên từ điển nguyên liệu (DISTINCT, đọc từ chỉ mục)
+    vocab = db.session.query(RecipeIngredient.normalized_name.label('name')).distinct().subquery()
+    matched_names = (db.session.query(vocab.c.name.label('name'),
+                                      func.max(case((is_soon, 1), else_=0)).label('urgent'))
+                     .join(Food, and_(Food.user_id == uid,
+                                      or_(_contains(vocab.c.name, food_name),
+                                          _contains(food_name, vocab.c.name))))
+                     .group_by(vocab.c.name).subquery())
+
+    # 2. Nối ngược về công thức bằng so sánh bằng trên normalized_name (dùng chỉ mục)
+    others = aliased(RecipeIngredient)
+    total = (db.session.query(func.count(others.id))
+             .filter(others.recipe_id == RecipeIngredient.recipe_id)
+             .correlate(RecipeIngredient).scalar_subquery())
+    rows = (db.session.query(RecipeIngredient.recipe_id,
+                             total,
+                             func.count(RecipeIngredient.id),
+                             func.sum(matched_names.c.urgent))
+            .join(matched_names, RecipeIngredient.normalized_name == matched_names.c.name)
+            .group_by(RecipeIngredient.recipe_id).all())
+
+    # Điểm được tính lại bằng Python để giữ nguyên cách làm tròn int() của code cũ
+    scored = {}
+    for rid, total, matched, urgent in rows:
+        base_score = int((matched / total) * 100)
+        total_score = base_score + URGENCY_BONUS * urgent
+        if rid in fav_ids or total_score > MIN_SCORE:
+            scored[rid] = (total_score, base_score, urgent > 0)
+    for rid in fav_ids:
+        scored.setdefault(rid, (0, 0, False))
+
+    stubs = [{'info': RecipeCard(rid, None, None, None, None), 'score': score, 'is_fav': rid in fav_ids}
+             for rid, (score, _, _) in scored.items()]
+    ranked_ids = [s['info'].id for s in rank_suggestions(stubs, top_k)]
+    if not ranked_ids:
+        return []
+
+    # Chỉ tải chi tiết cho top-k món cuối cùng
+    cards = {row[0]: RecipeCard(*row) for row in db.session.query(
+        Recipe.id, Recipe.name, Recipe.ingredients_list, Recipe.instructions, Recipe.image_url, Recipe.updated_at
+    ).filter(Recipe.id.in_(ranked_ids))}
+    fridge_items = set(name for (name,) in db.session.query(Food.normalized_name).filter_by(user_id=uid))
+
+    suggestions = []
+    for rid in ranked_ids:
+        if rid not in cards:
+            continue
+        needs = split_ingredients(cards[rid].ingredients_list)
+        matches = [need for need in needs
+                   if any(item in need or need in item for item in fridge_items)]
+        total_score, base_score, is_urgent = scored[rid]
+        suggestions.append({
+            'info': cards[rid],
+            'score': total_score,
+            'base_score': base_score,
+            'is_urgent': is_urgent,
+            'matches': matches,
+            'missing': set(needs) - set(matches),
+            'is_fav': rid in fav_ids
+        })
+    return suggestions
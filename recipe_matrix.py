@@ -0,0 +1,164 @@
+# File: recipe_matrix.py
+# Chấm điểm gợi ý dạng vector bằng NumPy.
+# Danh mục công thức được biểu diễn thành ma trận thưa (công thức x nguyên liệu)
+# dạng CSR, mỗi tủ lạnh là một vector trên từ điển nguyên liệu. Số nguyên liệu
+# khớp, điểm cơ bản, điểm thưởng và ngưỡng > 50 được tính cho mọi công thức
+# cùng lúc, và cho nhiều user trong một lượt (dùng để tính trước hằng đêm).
+import threading
+
+import numpy as np
+
+from extensions import db, suggestion_cache
+from models import Favorite, Food, User, normalize_ingredient
+from recipe_engine import MIN_SCORE, URGENCY_BONUS, URGENT_DAYS, get_recipe_index
+
+# Giới hạn số phần tử của ma trận tạm (user x ô khác 0) trong một lượt chấm điểm
+MAX_BLOCK_CELLS = 1 << 22
+
+
+class RecipeMatrix:
+    def __init__(self, index):
+        self.index = index
+        self.signature = index.signature
+        self.vocab = list(index.postings)                       # cột j -> nguyên liệu
+        self.column = {name: j for j, name in enumerate(self.vocab)}
+        self.cards = index.recipes                              # hàng i -> RecipeCard (theo id)
+        self.row = {card.id: i for i, card in enumerate(self.cards)}
+
+        # CSR: nguyên liệu của hàng i là indices[indptr[i]:indptr[i + 1]]
+        # (giữ cả phần tử trùng lặp để đếm giống hệt cách tính cũ)
+        self.lengths = np.fromiter((len(index.ingredients[card.id]) for card in self.cards),
+                                   dtype=np.int64, count=len(self.cards))
+        self.indptr = np.zeros(len(self.cards) + 1, dtype=np.int64)
+        np.cumsum(self.lengths, out=self.indptr[1:])
+        self.indices = np.fromiter((self.column[need] for card in self.cards
+                                    for need in index.ingredients[card.id]),
+                                   dtype=np.int64, count=int(self.indptr[-1]))
+
+    def vectors(self, fridge_names, urgent_names):
+        # Vector bool trên từ điển: nguyên liệu có trong tủ / sắp hết hạn
+        matched = np.zeros(len(self.vocab), dtype=bool)
+        urgent = np.zeros(len(self.vocab), dtype=bool)
+        matched[[self.column[n] for n in self.index.matching_ingredients(fridge_names)]] = True
+        urgent[[self.column[n] for n in self.index.matching_ingredients(urgent_names)]] = True
+        return matched, urgent & matched
+
+    def _row_sums(self, values):
+        # Tổng theo từng hàng CSR của một khối (user x ô khác 0): A @ x cho nhiều vector x
+        cumulative = np.zeros((values.shape[0], values.shape[1] + 1), dtype=np.int32)
+        np.cumsum(values, axis=1, dtype=np.int32, out=cumulative[:, 1:])
+        return cumulative[:, self.indptr[1:]] - cumulative[:, self.indptr[:-1]]
+
+    def score_block(self, matched, urgent):
+        # matched, urgent: ma trận bool (user x nguyên liệu).
+        # Trả về (điểm tổng, điểm cơ bản, số nguyên liệu gấp) dạng (user x công thức).
+        hits = self._row_sums(matched[:, self.indices])
+        urgent_hits = self._row_sums(urgent[:, self.indices])
+        # Cùng phép chia float64 rồi cắt phần thập phân như int((m / n) * 100)
+        ratio = np.divide(hits, self.lengths, out=np.zeros(hits.shape), where=self.lengths > 0)
+        base_score = (ratio * 100).astype(np.int64)
+        return base_score + URGENCY_BONUS * urgent_hits, base_score, urgent_hits
+
+    def _rank(self, total, base_score, urgent_hits, matched, fav_ids, top_k):
+        fav_rows = [self.row[rid] for rid in fav_ids if rid in self.row]
+        is_fav = np.zeros(len(self.cards), dtype=bool)
+        is_fav[fav_rows] = True
+        rows = np.flatnonzero(is_fav | (total > MIN_SCORE))
+        # Yêu thích trước, rồi điểm cao hơn; cùng hạng thì giữ thứ tự id (= thứ tự hàng)
+        rows = rows[np.lexsort((rows, -total[rows], ~is_fav[rows]))]
+        if top_k is not None:
+            rows = rows[:top_k]
+
+        matched_names = set(self.vocab[j] for j in np.flatnonzero(matched))
+        suggestions = []
+        for i in rows.tolist():
+            card = self.cards[i]
+            needs = self.index.ingredients[card.id]
+            matches = [need for need in needs if need in matched_names]
+            suggestions.append({
+                'info': card,
+                'score': int(total[i]),
+                'base_score': int(base_score[i]),
+                'is_urgent': bool(urgent_hits[i] > 0),
+                'matches': matches,
+                'missing': set(needs) - set(matches),
+                'is_fav': bool(is_fav[i])
+            })
+        return suggestions
+
+    def suggest(self, fridge_names, urgent_names, fav_ids, top_k=None):
+        # Cùng chữ ký và kết quả với RecipeIndex.suggest
+        return self.suggest_many({None: (fridge_names, urgent_names, fav_ids)}, top_k)[None]
+
+    def suggest_many(self, fridges, top_k=None):
+        # fridges: {khóa: (tên đồ trong tủ, tên đồ sắp hết hạn, id món yêu thích)}
+        # -> {khóa: danh sách gợi ý}. Chia khối để ma trận tạm không vượt MAX_BLOCK_CELLS.
+        keys = list(fridges)
+        block = max(1, MAX_BLOCK_CELLS // max(1, len(self.indices)))
+        results = {}
+        for start in range(0, len(keys), block):
+            chunk = keys[start:start + block]
+            pairs = [self.vectors(*fridges[key][:2]) for key in chunk]
+            matched = np.array([m for m, _ in pairs]).reshape(len(chunk), len(self.vocab))
+            urgent = np.array([u for _, u in pairs]).reshape(len(chunk), len(self.vocab))
+            total, base_score, urgent_hits = self.score_block(matched, urgent)
+            for n, key in enumerate(chunk):
+                results[key] = self._rank(total[n], base_score[n], urgent_hits[n],
+                                          matched[n], fridges[key][2], top_k)
+        return results
+
+
+# -----------------------------------------------------------
+# MA TRẬN DÙNG CHUNG TRONG PROCESS (dựng lại khi chỉ mục đổi)
+# -----------------------------------------------------------
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def get_recipe_matrix(index=None):
+    global _matrix
+    index = index or get_recipe_index()
+    matrix = _matrix
+    if matrix is None or matrix.index is not index:
+        with _lock:
+            if _matrix is None or _matrix.index is not index:
+                _matrix = RecipeMatrix(index)
+            matrix = _matrix
+    return matrix
+
+
+# -----------------------------------------------------------
+# TÍNH TRƯỚC GỢI Ý CHO MỌI USER
+# -----------------------------------------------------------
+
+def load_fridges(user_ids, today):
+    # Đọc tủ lạnh và món yêu thích của nhiều user bằng 2 truy vấn
+    fridges = {uid: ([], [], []) for uid in user_ids}
+    for uid, name, expiration_date in db.session.query(
+            Food.user_id, Food.name, Food.expiration_date).filter(Food.user_id.in_(user_ids)):
+        item = normalize_ingredient(name)
+        fridges[uid][0].append(item)
+        if 0 <= (expiration_date - today).days <= URGENT_DAYS:
+            fridges[uid][1].append(item)
+    for uid, recipe_id in db.session.query(
+            Favorite.user_id, Favorite.recipe_id).filter(Favorite.user_id.in_(user_ids)):
+        fridges[uid][2].append(recipe_id)
+    return fridges
+
+
+def precompute_suggestions(today, top_k=None, batch_size=500):
+    """Chấm điểm cho mọi user theo từng lô và ghi vào cache gợi ý. Trả về số user."""
+    matrix = get_recipe_matrix()
+    count, last_id = 0, 0
+    while True:
+        user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.id > last_id)
+                    .order_by(User.id).limit(batch_size)]
+        if not user_ids:
+            return count
+        fridges = load_fridges(user_ids, today)
+        for uid, suggestions in matrix.suggest_many(fridges, top_k).items():
+            suggestion_cache.set(uid, today, matrix.signature, (suggestions, fridges[uid][2]))
+        count += len(user_ids)
+        last_id = user_ids[-1]
+        db.session.rollback()  # Không giữ transaction đọc mở giữa các lô
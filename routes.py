@@ -0,0 +1,530 @@
+# File: routes.py
+# Các route, lệnh CLI và hook "dữ liệu đổi" của ứng dụng, gom trong blueprint "main"
+# để create_app() (app.py) đăng ký vào app.
+from flask import Blueprint, current_app, render_template, url_for, flash, redirect, request, session, Response, stream_with_context
+from extensions import db, suggestion_cache, password_hasher, metrics, data_versions
+from passwords import HasherBusy
+from models import User, Food, Favorite, Recipe, normalize_ingredient
+from recipe_engine import get_recipe_index, invalidate_recipe_index, suggest_sql
+from recipe_matrix import get_recipe_matrix, precompute_suggestions
+from migrations import upgrade_db, backfill_nutrition_groups
+from nutrition import NUTRITION_GROUPS
+from food_queries import EXPIRY_BUCKETS, list_foods, parse_cursor
+from food_batch import apply_batch
+from food_io import detect_format, export_foods, food_to_json, import_foods, parse_quantity
+from expiry import apply_food_changes, expiring_by_status, expiring_counts, expiring_items, refresh_users, run_expiry_job
+from food_stats import BUCKET, LOCATION, NUTRITION, food_state
+import food_stats
+from suggest_parity import check_suggestions
+from catalog import DEFAULT_CATALOG, load_catalog_file
+from datetime import datetime, date
+from sqlalchemy.orm import joinedload
+import os
+import click
+
+# cli_group=None: lệnh CLI giữ tên cũ ("flask upgrade-db", không phải "flask main upgrade-db")
+bp = Blueprint('main', __name__, cli_group=None)
+
+def fridge_changed(uid, rebuild=False):
+    # Commit thay đổi Food/Favorite của user (gọi thay cho db.session.commit()) cùng với
+    # phiên bản dữ liệu mới dùng cho ETag, và bỏ kết quả gợi ý đã lưu. Phiên bản nằm
+    # trong cùng transaction nên không thể có thay đổi đã lưu mà ETag vẫn cũ.
+    # rebuild=True (sau khi nhập hàng loạt): tính lại cả bảng sắp hết hạn và bộ đếm thống kê;
+    # thêm/sửa/xóa từng món thì đã cập nhật hai bảng này qua apply_food_changes trước khi commit
+    suggestion_cache.invalidate(uid)
+    data_versions.bump_user(uid)
+    if rebuild:
+        today = date.today()
+        refresh_users([uid], today)
+        food_stats.rebuild([uid], today)
+    db.session.commit()
+
+# -----------------------------------------------------------
+# ROUTES CƠ BẢN
+# -----------------------------------------------------------
+
+def _fridge_page(uid, today):
+    # Đọc tham số lọc/phân trang chung cho trang chủ và bản JSON
+    location = request.args.get('location') or None
+    bucket = request.args.get('bucket') if request.args.get('bucket') in EXPIRY_BUCKETS else None
+    after = parse_cursor(request.args.get('after'))
+    foods, next_cursor = list_foods(uid, today, after=after, location=location, bucket=bucket,
+                                    limit=current_app.config["FRIDGE_PAGE_SIZE"])
+    return foods, next_cursor, location, bucket
+
+@bp.route('/')
+@data_versions.conditional
+def home():
+    if 'user_id' not in session:
+        return redirect(url_for('.login'))
+    
+    # Quan trọng: Luôn truyền 'today' để index.html tính toán hạn sử dụng
+    today = date.today()
+    # Đọc bảng sắp hết hạn trước: nếu phải làm mới thì commit sẽ làm hết hạn
+    # các đối tượng Food đã tải (mỗi dòng lại bị truy vấn lại khi render)
+    expired_count, soon_count = expiring_counts(session['user_id'], today)
+    user_foods, next_cursor, location, bucket = _fridge_page(session['user_id'], today)
+    
+    return render_template('index.html', foods=user_foods, today=today,
+                           next_cursor=next_cursor, location=location, bucket=bucket,
+                           expired_count=expired_count, soon_count=soon_count)
+
+@bp.route('/foods.json')
+def foods_json():
+    # Bản JSON của danh sách để Modal/nút "Xem thêm" tải tiếp từng trang
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    today = date.today()
+    foods, next_cursor, _, _ = _fridge_page(session['user_id'], today)
+    return {
+        "items": [food_to_json(f, today) for f in foods],
+        "next_cursor": next_cursor
+    }
+
+@bp.route('/expiring.json')
+def expiring_json():
+    # Danh sách gọn các thực phẩm đã/sắp hết hạn, đọc từ bảng tính sẵn
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    today = date.today()
+    expired, soon = expiring_items(session['user_id'], today)
+    to_json = lambda item: {
+        "id": item.food_id,
+        "name": item.name,
+        "location": item.location,
+        "expiration_date": item.expiration_date.isoformat(),
+        "days_left": (item.expiration_date - today).days
+    }
+    return {
+        "as_of": today.isoformat(),
+        "expired": [to_json(item) for item in expired],
+        "soon": [to_json(item) for item in soon]
+    }
+
+@bp.route("/register", methods=['GET', 'POST'])
+def register():
+    if 'user_id' in session: return redirect(url_for('.home'))
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        
+        existing_user = User.query.filter((User.username == username) | (User.email == email)).first()
+        if existing_user:
+            flash('Tên đăng nhập hoặc Email đã tồn tại!', 'danger')
+            return redirect(url_for('.register'))
+
+        try:
+            hashed_password = password_hasher.generate(password)
+        except HasherBusy:
+            flash('Hệ thống đang bận, vui lòng thử lại sau giây lát.', 'warning')
+            return redirect(url_for('.register'))
+        new_user = User(username=username, email=email, password_hash=hashed_password)
+        
+        try:
+            db.session.add(new_user)
+            db.session.commit()
+            flash('Đăng ký thành công!', 'success')
+            return redirect(url_for('.login'))
+        except:
+            db.session.rollback()
+            flash('Lỗi hệ thống.', 'danger')
+    return render_template('auth/register.html')
+
+@bp.route("/login", methods=['GET', 'POST'])
+def login():
+    if 'user_id' in session: return redirect(url_for('.home'))
+    if request.method == 'POST':
+        username = request.form.get('username')
+        password = request.form.get('password')
+        user = User.query.filter_by(username=username).first()
+
+        try:
+            # Đúng mật khẩu mà hash dùng cost cũ thì được băm lại ngay
+            ok = user is not None and password_hasher.verify_and_update(user, password)
+        except HasherBusy:
+            flash('Hệ thống đang bận, vui lòng thử lại sau giây lát.', 'warning')
+            return render_template('auth/login.html')
+
+        if ok:
+            if db.session.dirty:
+                db.session.commit()
+            session['user_id'] = user.id
+            session['username'] = user.username
+            flash(f'Chào mừng {user.username} quay trở lại!', 'success')
+            return redirect(url_for('.home'))
+        else:
+            flash('Sai tên đăng nhập hoặc mật khẩu.', 'danger')
+    return render_template('auth/login.html')
+
+@bp.route("/logout")
+def logout():
+    session.clear()
+    flash('Đã đăng xuất.', 'info')
+    return redirect(url_for('.login'))
+
+# -----------------------------------------------------------
+# QUẢN LÝ THỰC PHẨM (Hỗ trợ Modal)
+# -----------------------------------------------------------
+
+@bp.route("/add_food", methods=['POST'])
+def add_food():
+    if 'user_id' not in session: return redirect(url_for('.login'))
+
+    try:
+        name = request.form.get('name')
+        quantity = parse_quantity(request.form.get('quantity'))
+        unit = request.form.get('unit')
+        location = request.form.get('location')
+        date_str = request.form.get('expiration_date')
+        expiration_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        
+        new_food = Food(
+            name=name, quantity=quantity, unit=unit,
+            location=location, expiration_date=expiration_date,
+            user_id=session['user_id']
+        )
+        db.session.add(new_food)
+        db.session.flush()
+        apply_food_changes(session['user_id'], [(None, food_state(new_food))], date.today())
+        fridge_changed(session['user_id'])
+        flash(f'Đã thêm {name}!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Lỗi: {str(e)}', 'danger')
+        
+    return redirect(url_for('.home')) # Luôn quay về trang chủ vì dùng Modal
+
+@bp.route('/edit_food/<int:id>', methods=['POST'])
+def edit_food(id):
+    if 'user_id' not in session: return redirect(url_for('.login'))
+    food = Food.query.get_or_404(id)
+    if food.user_id != session['user_id']: return redirect(url_for('.home'))
+
+    try:
+        before = food_state(food)
+        food.name = request.form.get('name')
+        food.quantity = parse_quantity(request.form.get('quantity'))
+        food.unit = request.form.get('unit')
+        food.location = request.form.get('location')
+        date_str = request.form.get('expiration_date')
+        food.expiration_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        
+        db.session.flush()
+        apply_food_changes(session['user_id'], [(before, food_state(food))], date.today())
+        fridge_changed(session['user_id'])
+        flash('Cập nhật thành công!', 'success')
+    except:
+        db.session.rollback()
+        flash('Lỗi khi cập nhật.', 'danger')
+
+    return redirect(url_for('.home')) # Quay về trang chủ sau khi sửa xong Modal
+
+@bp.route('/delete_food/<int:id>')
+def delete_food(id):
+    if 'user_id' not in session: return redirect(url_for('.login'))
+    food = Food.query.get_or_404(id)
+    if food.user_id == session['user_id']:
+        before = food_state(food)
+        db.session.delete(food)
+        db.session.flush()
+        apply_food_changes(session['user_id'], [(before, None)], date.today())
+        fridge_changed(session['user_id'])
+        flash('Đã xóa thực phẩm.', 'info')
+    return redirect(url_for('.home'))
+
+@bp.route('/import_foods', methods=['POST'])
+def import_foods_route():
+    # Nhận file CSV/NDJSON (form field "file") hoặc gửi thẳng trong body request
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    upload = request.files.get('file')
+    if upload:
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        stream = upload.stream
+    else:
+        fmt = request.args.get('format') or detect_format(mimetype=request.mimetype)
+        stream = request.stream
+
+    # Các lô trước chỗ lỗi đã được commit: luôn làm mới cache/thống kê nếu có dòng được ghi
+    result = {'inserted': 0}
+    try:
+        import_foods(stream, fmt, session['user_id'], batch_size=current_app.config["IMPORT_BATCH_SIZE"],
+                     result=result)
+    finally:
+        if result['inserted']:
+            fridge_changed(session['user_id'], rebuild=True)
+    return result, 400 if 'error' in result else 200
+
+@bp.route('/foods/batch', methods=['POST'])
+def foods_batch():
+    # Nhiều thao tác trong một request JSON, ví dụ:
+    # {"operations": [{"op": "delete", "id": 5}, {"op": "adjust", "id": 7, "delta": -1},
+    #                 {"op": "update", "id": 8, "location": "Ngăn đá"}, {"op": "create", "name": ...}]}
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list):
+        return {"error": 'Body phải có dạng {"operations": [...]}'}, 400
+    if len(operations) > current_app.config["BATCH_MAX_OPS"]:
+        return {"error": f'Tối đa {current_app.config["BATCH_MAX_OPS"]} thao tác mỗi request'}, 413
+
+    # apply_batch đổi phiên bản dữ liệu và bỏ gợi ý đã lưu trong transaction của nó
+    return apply_batch(session['user_id'], operations, date.today())
+
+@bp.route('/export_foods')
+def export_foods_route():
+    if 'user_id' not in session: return redirect(url_for('.login'))
+
+    fmt = 'ndjson' if request.args.get('format') == 'ndjson' else 'csv'
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+    return Response(stream_with_context(export_foods(session['user_id'], fmt)),
+                    content_type=f'{mimetype}; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename=tu_lanh.{fmt}'})
+
+# -----------------------------------------------------------
+# GỢI Ý & THỐNG KÊ
+# -----------------------------------------------------------
+
+# Route Suggest
+@bp.route('/suggest')
+@data_versions.conditional(catalog=True)
+def suggest():
+    if 'user_id' not in session:
+        return redirect(url_for('.login'))
+
+    uid = session['user_id']
+    today = date.today()
+    index = get_recipe_index()
+
+    cached = suggestion_cache.get(uid, today, index.signature)
+    if cached is not None:
+        smart_suggestions, fav_ids = cached
+    else:
+        fav_ids = [f.recipe_id for f in Favorite.query.filter_by(user_id=uid).all()]
+        top_k = current_app.config["SUGGEST_TOP_K"]
+
+        if current_app.config["SUGGEST_BACKEND"] == "sql":
+            # Khớp và đếm nguyên liệu ngay trong database
+            smart_suggestions = suggest_sql(uid, today, fav_ids, top_k=top_k)
+        else:
+            all_foods = Food.query.filter_by(user_id=uid).all()
+
+            # 1. Danh sách thực phẩm sắp hết hạn (còn <= 3 ngày) để tính trọng số
+            soon_to_expire_names = [normalize_ingredient(f.name) for f in all_foods
+                                   if 0 <= (f.expiration_date - today).days <= 3]
+            fridge_items = [normalize_ingredient(f.name) for f in all_foods]
+
+            # 2. Chấm điểm qua chỉ mục ngược (chỉ xét các món có chung nguyên liệu với tủ)
+            #    hoặc qua ma trận NumPy (chấm mọi món cùng lúc)
+            scorer = get_recipe_matrix(index) if current_app.config["SUGGEST_BACKEND"] == "matrix" else index
+            smart_suggestions = scorer.suggest(fridge_items, soon_to_expire_names, fav_ids, top_k=top_k)
+
+        suggestion_cache.set(uid, today, index.signature, (smart_suggestions, fav_ids))
+
+    return render_template('food/suggest.html',
+                               all_recipes=index.browse(fav_ids),
+                               smart_suggestions=smart_suggestions,
+                               fav_ids=fav_ids)
+
+@bp.route('/toggle_favorite/<int:recipe_id>', methods=['POST'])
+def toggle_favorite(recipe_id):
+    if 'user_id' not in session:
+        return {"error": "Unauthorized"}, 401
+    
+    uid = session['user_id']
+    # Tìm xem bản ghi đã tồn tại chưa
+    fav = Favorite.query.filter_by(user_id=uid, recipe_id=recipe_id).first()
+
+    if fav:
+        db.session.delete(fav)
+        status = "unhearted"
+    else:
+        # Khóa ngoại được kiểm tra (SQLite bật foreign_keys, Postgres luôn kiểm tra)
+        if db.session.get(Recipe, recipe_id) is None:
+            return {"error": "Không tìm thấy công thức"}, 404
+        new_fav = Favorite(user_id=uid, recipe_id=recipe_id)
+        db.session.add(new_fav)
+        status = "hearted"
+    
+    fridge_changed(uid)
+    return {"status": status}
+
+@bp.route('/metrics', endpoint='metrics')
+def metrics_endpoint():
+    # Định dạng văn bản của Prometheus. Chỉ bật (METRICS_ENABLED=1) khi cổng web không
+    # mở ra ngoài hoặc đường dẫn này bị chặn ở reverse proxy.
+    if not current_app.config["METRICS_ENABLED"]:
+        return "Not Found", 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@bp.route('/statistics')
+@data_versions.conditional
+def statistics():
+    if 'user_id' not in session: return redirect(url_for('.login'))
+    uid = session['user_id']
+    today = date.today()
+
+    # 1. Thống kê vị trí và Phân loại hạn dùng: đọc từ bộ đếm tính sẵn (food_stats.py),
+    #    danh sách đồ đã hết hạn (và món sắp hết hạn đầu tiên) đọc từ bảng ExpiringItem
+    stats = food_stats.summary(uid, today)
+    location_data = list(stats[LOCATION].items())
+    total_count = sum(stats[LOCATION].values())
+    expired_count = stats[BUCKET].get('expired', 0)
+    soon_count = stats[BUCKET].get('soon', 0)
+    fresh_count = stats[BUCKET].get('fresh', 0)
+    expired_list = expiring_by_status(uid, today, 'expired')
+    soon_first = expiring_by_status(uid, today, 'soon', limit=1)
+
+    # 2. Phân tích Dinh dưỡng (nhóm đã được tính sẵn khi thêm/sửa thực phẩm)
+    nutrition_counts = {key: stats[NUTRITION].get(key, 0) for key in NUTRITION_GROUPS}
+
+    # 3. Tính điểm Sức khỏe và Lời khuyên
+    health_score = 100
+    if total_count > 0:
+        score = 100 - (expired_count * 10) - (soon_count * 5)
+        health_score = max(0, score)
+
+    # Tạo danh sách lời khuyên dựa trên dữ liệu
+    advice = []
+    if health_score >= 80:
+        advice.append("🌟 Bạn quản lý tủ lạnh rất tuyệt vời, hãy tiếp tục phát huy!")
+    elif health_score >= 50:
+        advice.append("⚠️ Tủ lạnh bắt đầu có dấu hiệu quá tải đồ cũ, bạn nên kiểm tra lại.")
+    else:
+        advice.append("🚨 Báo động! Tủ lạnh đang rất mất cân đối và nhiều đồ hỏng.")
+
+    if expired_count:
+        advice.append(f"❌ Có {expired_count} món đã quá hạn. Bạn nên bỏ ngay để bảo vệ sức khỏe.")
+    if soon_first:
+        advice.append(f"⏰ Nhắc nhở: Hãy nấu món '{soon_first[0].name}' ngay vì nó sắp hết hạn.")
+    
+    # Kiểm tra nhóm chất thiếu
+    missing = [group for group, count in nutrition_counts.items() if count == 0]
+    if missing:
+        advice.append(f"🛒 Lần tới đi chợ, hãy bổ sung thêm: {', '.join(missing)}.")
+
+    return render_template('statistics.html', 
+                           location_labels=[row[0] for row in location_data],
+                           location_values=[row[1] for row in location_data],
+                           status_values=[expired_count, soon_count, fresh_count],
+                           nutrition_labels=list(nutrition_counts.keys()),
+                           nutrition_values=list(nutrition_counts.values()),
+                           health_score=health_score,
+                           expired_list=expired_list, expired_count=expired_count, soon_count=soon_count,
+                           total_count=total_count,
+                           today=today,
+                           advice=advice)
+
+def catalog_changed():
+    # Danh mục công thức đổi: dựng lại chỉ mục và bỏ toàn bộ gợi ý đã lưu
+    invalidate_recipe_index()
+    suggestion_cache.clear()
+
+# Danh mục chỉ được nạp qua CLI: nạp kiểu upsert ghi đè được nội dung công thức đã có
+@bp.cli.command("load-recipes")
+@click.argument("path", required=False)
+@click.option("--batch-size", type=int, help="Số công thức mỗi transaction (mặc định: CATALOG_BATCH_SIZE).")
+def load_recipes_command(path, batch_size):
+    """Nạp danh mục công thức từ file JSON/NDJSON/CSV (upsert theo external_id)."""
+    path = path or os.path.join(current_app.root_path, DEFAULT_CATALOG)
+    result = load_catalog_file(path, batch_size=batch_size or current_app.config["CATALOG_BATCH_SIZE"])
+    catalog_changed()
+    print(f"Mới: {result['inserted']}, cập nhật: {result['updated']}, "
+          f"không đổi: {result['unchanged']}, lỗi: {result['failed']}")
+
+@bp.route('/account', methods=['GET', 'POST'])
+def account():
+    if 'user_id' not in session:
+        return redirect(url_for('.login'))
+    
+    user = User.query.get(session['user_id'])
+
+    if request.method == 'POST':
+        old_pass = request.form.get('old_password')
+        new_pass = request.form.get('new_password')
+        
+        if old_pass and new_pass:
+            # Kiểm tra mật khẩu cũ có khớp với hash trong DB không
+            try:
+                if password_hasher.check(user.password_hash, old_pass):
+                    user.password_hash = password_hasher.generate(new_pass)
+                    db.session.commit()
+                    flash('Cập nhật mật khẩu thành công!', 'success')
+                else:
+                    flash('Mật khẩu cũ không chính xác.', 'danger')
+            except HasherBusy:
+                flash('Hệ thống đang bận, vui lòng thử lại sau giây lát.', 'warning')
+        return redirect(url_for('.account'))
+
+    # Lấy danh sách các món ăn mà user này đã nhấn yêu thích
+    # Chúng ta sử dụng join để lấy được thông tin chi tiết từ bảng Recipe (1 truy vấn)
+    user_favorites = Favorite.query.options(joinedload(Favorite.recipe)).filter_by(user_id=user.id).all()
+
+    return render_template('auth/account.html', user=user, favorites=user_favorites)
+@bp.cli.command("upgrade-db")
+def upgrade_db_command():
+    """Tạo bảng/cột mới và chuyển dữ liệu cũ (nguyên liệu, tên chuẩn hóa, nhóm dinh dưỡng)."""
+    counts = upgrade_db()
+    print(f"Đã chuẩn hóa nguyên liệu cho {counts['recipes']} công thức.")
+    print(f"Đã chuẩn hóa tên cho {counts['foods']} thực phẩm.")
+    print(f"Đã phân loại dinh dưỡng cho {counts['nutrition']} thực phẩm.")
+
+@bp.cli.command("backfill-nutrition")
+def backfill_nutrition_command():
+    """Phân loại nhóm dinh dưỡng cho các thực phẩm đã có."""
+    count = backfill_nutrition_groups()
+    food_stats.invalidate_all()  # Bộ đếm nhóm dinh dưỡng được dựng lại khi cần
+    data_versions.bump_all()  # Trang Thống kê của mọi user phải render lại
+    db.session.commit()
+    print(f"Đã phân loại {count} thực phẩm.")
+
+@bp.cli.command("check-suggest")
+@click.option("--users", default=20, help="Số user được kiểm tra (các id nhỏ nhất).")
+def check_suggest_command(users):
+    """So gợi ý của chỉ mục, SQL và ma trận NumPy với thuật toán gốc."""
+    user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id).limit(users)]
+    mismatched = check_suggestions(user_ids, date.today(), top_k=current_app.config["SUGGEST_TOP_K"])
+    for backend, uids in mismatched.items():
+        print(f"{backend}: {len(user_ids) - len(uids)}/{len(user_ids)} user khớp"
+              + (f", khác ở: {', '.join(str(uid) for uid in uids[:50])}" if uids else ""))
+
+@bp.cli.command("check-stats")
+@click.option("--rebuild", is_flag=True, help="Dựng lại bộ đếm của các user bị sai lệch.")
+@click.option("--batch-size", default=500, help="Số user mỗi lượt kiểm tra.")
+def check_stats_command(rebuild, batch_size):
+    """So bộ đếm thống kê với dữ liệu thực phẩm (và dựng lại nếu cần)."""
+    today = date.today()
+    checked, mismatched = food_stats.check(today, batch_size=batch_size)
+    print(f"Đã kiểm tra {checked} user, {len(mismatched)} user bị sai lệch.")
+    if mismatched:
+        print("User sai lệch: " + ", ".join(str(uid) for uid in mismatched[:50]))
+    if rebuild and mismatched:
+        for start in range(0, len(mismatched), batch_size):
+            food_stats.rebuild(mismatched[start:start + batch_size], today)
+            db.session.commit()
+        print(f"Đã dựng lại bộ đếm cho {len(mismatched)} user.")
+
+@bp.cli.command("refresh-expiring")
+@click.option("--batch-size", default=500, help="Số user mỗi transaction.")
+def refresh_expiring_command(batch_size):
+    """Làm mới bảng thực phẩm đã/sắp hết hạn cho mọi user (chạy mỗi ngày qua cron)."""
+    count = run_expiry_job(date.today(), batch_size=batch_size)
+    if count is None:
+        print("Job đang được một process khác chạy.")
+    else:
+        print(f"Đã làm mới {count} user.")
+
+@bp.cli.command("precompute-suggestions")
+@click.option("--batch-size", default=500, help="Số user mỗi lượt chấm điểm.")
+def precompute_suggestions_command(batch_size):
+    """Chấm điểm gợi ý cho mọi user bằng ma trận NumPy và ghi sẵn vào cache."""
+    if suggestion_cache.stats()["backend"] != "sqlite":
+        print("Lưu ý: chỉ cache SUGGEST_CACHE_BACKEND=sqlite mới được các worker web dùng lại.")
+    count = precompute_suggestions(date.today(), top_k=current_app.config["SUGGEST_TOP_K"], batch_size=batch_size)
+    print(f"Đã tính trước gợi ý cho {count} user.")
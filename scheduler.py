@@ -0,0 +1,84 @@
+# File: scheduler.py
+# Bộ hẹn giờ chạy một job mỗi ngày trong chính process web (thay cho cron).
+# Thread được khởi động lười ở request đầu tiên của từng process (không chạy
+# trong lệnh CLI, và được tạo lại sau khi gunicorn fork worker). Nhiều worker
+# cùng bật cũng không sao: job tự nhận quyền chạy qua JobState.
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+
+class DailyScheduler:
+    def __init__(self, name):
+        self.name = name
+        self.enabled = False
+        self.run_hour = 2
+        self._app = None
+        self._db = None
+        self._job = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # Số liệu theo dõi
+        self.runs = 0
+        self.errors = 0
+        self.last_processed = 0
+        self.last_seconds = 0.0
+
+    def init_app(self, app, db, job, enabled=False, run_hour=2):
+        # job(today) được gọi trong app context, trả về số bản ghi đã xử lý (hoặc None)
+        self._app, self._db, self._job = app, db, job
+        self.enabled, self.run_hour = enabled, run_hour
+        if enabled:
+            app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._loop, name=f'{self.name}-scheduler', daemon=True)
+                    self._thread.start()
+
+    def seconds_until_next_run(self, now=None):
+        now = now or datetime.now()
+        next_run = now.replace(hour=self.run_hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def run_once(self):
+        start = time.perf_counter()
+        with self._app.app_context():
+            try:
+                processed = self._job(date.today())
+                self.runs += 1
+                if processed is not None:
+                    self.last_processed = processed
+            except Exception:
+                self.errors += 1
+                self._app.logger.exception('Job %s lỗi', self.name)
+            finally:
+                self._db.session.remove()
+        self.last_seconds = time.perf_counter() - start
+
+    def _loop(self):
+        # Chạy một lượt khi khởi động (job tự bỏ qua nếu hôm nay đã xong), rồi mỗi ngày một lần
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.seconds_until_next_run())
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'running': bool(self._thread and self._thread.is_alive()),
+            'runs': self.runs,
+            'errors': self.errors,
+            'last_processed': self.last_processed,
+            'last_seconds': self.last_seconds,
+        }
@@ -0,0 +1,151 @@
+# File: suggest_cache.py
+# Bộ nhớ đệm kết quả Gợi ý món ăn theo từng user.
+# Kết quả chỉ phụ thuộc vào Food, Favorite của user, danh mục công thức và ngày
+# hôm nay, nên ta lưu lại và chỉ tính lại khi một trong các yếu tố đó thay đổi.
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """LRU trong bộ nhớ của process (phù hợp khi chỉ chạy 1 worker)."""
+
+    name = 'memory'
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """LRU dùng chung giữa các worker gunicorn qua một file SQLite cục bộ."""
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_size=1000):
+        self.path = path
+        self.max_size = max_size
+        self._local = threading.local()
+        self._execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)')
+        self._execute('CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache (accessed)')
+
+    def _conn(self):
+        # Mỗi thread (và mỗi process sau khi fork) dùng kết nối riêng
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _execute(self, sql, params=()):
+        return self._conn().execute(sql, params)
+
+    def get(self, key):
+        row = self._execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self._execute('UPDATE cache SET accessed = ? WHERE key = ?', (time.time(), key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._execute('INSERT OR REPLACE INTO cache (key, value, accessed) VALUES (?, ?, ?)', (key, blob, time.time()))
+        self._execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                      (self.max_size,))
+
+    def delete(self, key):
+        self._execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._execute('DELETE FROM cache')
+
+    def size(self):
+        return self._execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class SuggestionCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        kind = app.config.setdefault('SUGGEST_CACHE_BACKEND', 'memory')
+        max_size = app.config.setdefault('SUGGEST_CACHE_SIZE', 1000)
+        if kind == 'sqlite':
+            path = app.config.get('SUGGEST_CACHE_PATH') or os.path.join(app.instance_path, 'suggest_cache.sqlite')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(path, max_size)
+        elif kind == 'memory':
+            self.backend = MemoryBackend(max_size)
+        else:
+            self.backend = None  # Tắt cache
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, uid, day, catalog):
+        # Mục cache hết hiệu lực khi sang ngày mới (cửa sổ 3 ngày dịch chuyển)
+        # hoặc khi danh mục công thức đổi
+        entry = self.backend.get(f'u:{uid}') if self.backend else None
+        if entry is not None and entry[0] == day.isoformat() and entry[1] == catalog:
+            self._count(True)
+            return entry[2]
+        self._count(False)
+        return None
+
+    def set(self, uid, day, catalog, payload):
+        if self.backend:
+            self.backend.set(f'u:{uid}', (day.isoformat(), catalog, payload))
+
+    def invalidate(self, uid):
+        if self.backend:
+            self.backend.delete(f'u:{uid}')
+
+    def clear(self):
+        if self.backend:
+            self.backend.clear()
+
+    def stats(self):
+        return {
+            'backend': self.backend.name if self.backend else 'none',
+            'size': self.backend.size() if self.backend else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,78 @@
+# File: suggest_parity.py
+# So kết quả Gợi ý của các cách chấm điểm nhanh (chỉ mục, SQL, ma trận NumPy) với
+# thuật toán gốc quét mọi công thức. Dùng cho lệnh "flask check-suggest" và cho
+# benchmark, để bắt các khác biệt như chuẩn hóa tên giữa Python và SQL.
+from extensions import db
+from models import Food
+from recipe_engine import MIN_SCORE, URGENCY_BONUS, URGENT_DAYS, get_recipe_index, suggest_sql
+from recipe_matrix import get_recipe_matrix, load_fridges
+
+BACKENDS = ('index', 'sql', 'matrix')
+
+
+def suggest_baseline(fridge, recipes, fav_ids, today):
+    # Thuật toán gốc của route /suggest, giữ nguyên từng bước.
+    # fridge: [(tên, ngày hết hạn)], recipes: các công thức theo thứ tự id
+    soon_to_expire_names = [name.lower().strip() for name, expiration_date in fridge
+                            if 0 <= (expiration_date - today).days <= URGENT_DAYS]
+    fridge_items = [name.lower().strip() for name, _ in fridge]
+
+    smart_suggestions = []
+    for recipe in recipes:
+        recipe_ingredients = [i.strip().lower() for i in recipe.ingredients_list.split(',')]
+        matches = []
+        urgency_bonus = 0
+        for need in recipe_ingredients:
+            if any(item in need or need in item for item in fridge_items):
+                matches.append(need)
+                if any(soon in need or need in soon for soon in soon_to_expire_names):
+                    urgency_bonus += URGENCY_BONUS
+
+        base_score = int((len(matches) / len(recipe_ingredients)) * 100) if recipe_ingredients else 0
+        total_score = base_score + urgency_bonus
+        is_fav = recipe.id in fav_ids
+        if is_fav or total_score > MIN_SCORE:
+            smart_suggestions.append({
+                'info': recipe,
+                'score': total_score,
+                'base_score': base_score,
+                'is_urgent': urgency_bonus > 0,
+                'matches': matches,
+                'missing': set(recipe_ingredients) - set(matches),
+                'is_fav': is_fav
+            })
+
+    smart_suggestions.sort(key=lambda x: (x['is_fav'], x['score']), reverse=True)
+    return smart_suggestions
+
+
+def _comparable(suggestions):
+    return [(s['info'].id, s['score'], s['base_score'], s['is_urgent'], tuple(s['matches']),
+             frozenset(s['missing']), s['is_fav']) for s in suggestions]
+
+
+def check_suggestions(user_ids, today, top_k=None):
+    """Chấm điểm cho từng user bằng mọi cách và so với thuật toán gốc.
+    Trả về {tên cách chấm điểm: [id user có kết quả khác]}."""
+    index = get_recipe_index()
+    matrix = get_recipe_matrix(index)
+    fridges = load_fridges(user_ids, today)
+    raw = {uid: [] for uid in user_ids}
+    for uid, name, expiration_date in db.session.query(
+            Food.user_id, Food.name, Food.expiration_date).filter(Food.user_id.in_(user_ids)):
+        raw[uid].append((name, expiration_date))
+
+    mismatched = {backend: [] for backend in BACKENDS}
+    for uid in user_ids:
+        names, soon, fav_ids = fridges[uid]
+        expected = _comparable(suggest_baseline(raw[uid], index.recipes, set(fav_ids), today)[:top_k])
+        results = {
+            'index': index.suggest(names, soon, fav_ids, top_k=top_k),
+            'sql': suggest_sql(uid, today, fav_ids, top_k=top_k),
+            'matrix': matrix.suggest(names, soon, fav_ids, top_k=top_k),
+        }
+        for backend, suggestions in results.items():
+            if _comparable(suggestions) != expected:
+                mismatched[backend].append(uid)
+    db.session.rollback()
+    return mismatched
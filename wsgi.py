@@ -0,0 +1,7 @@
+# File: wsgi.py
+# Điểm vào cho gunicorn: "gunicorn wsgi:app" (gunicorn.conf.py đã đặt sẵn wsgi_app).
+# Tách khỏi app.py để import create_app() (test, công cụ, benchmark) không tự dựng
+# một app theo DATABASE_URL hiện tại.
+from app import create_app
+
+app = create_app()